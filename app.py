@@ -1,51 +1,29 @@
-import os
-import sys
-import joblib
 import builtins
-import numpy as np
+import os
+import functools
+import threading
+from collections import Counter
+import multiprocessing
 import tkinter as tk
 from tkinter import messagebox, filedialog
 
 # ==== Internal Components ====
-from components.preprocess import clean_text
-from components.sms_cropper import SMSCropper
-from components.feature_extraction import (
-    detect_urls, detect_emails, detect_phone_numbers, detect_domains
-)
+# Heavy resources (model bundle, spaCy, NLTK, OCR libraries) are not imported
+# here: the engine warms up in the background while the intro splash shows,
+# and OCR modules load when the first image is opened.
+from components import engine
+from components.classifier_pool import ClassificationExecutor
+from components.ingest_queue import IngestQueue
+from components.ui_dispatcher import UIDispatcher
+from components.ingest_log import IngestLogWriter
+from components import ocr_backend
 from components.intro_screen import IntroScreen
 from components.user_verification import UserVerification
 from components.network_sms_receiver import NetworkSMSReceiver, PORT
+from components.server import reply_to_batch, reply_shed
 
 # ==== UI Builder ====
-from design import build_ui
-
-
-# ================================================================
-#                      RESOURCE PATH
-# ================================================================
-def resource_path(relative_path: str) -> str:
-    try:
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
-
-
-# ================================================================
-#                      MODEL LOADING
-# ================================================================
-MODEL_PATH = resource_path("sms_model.joblib")
-VECTORIZER_PATH = resource_path("tfidf_vectorizer.joblib")
-
-MODEL = None
-VECTORIZER = None
-
-if os.path.exists(MODEL_PATH) and os.path.exists(VECTORIZER_PATH):
-    try:
-        MODEL = joblib.load(MODEL_PATH)
-        VECTORIZER = joblib.load(VECTORIZER_PATH)
-    except Exception as e:
-        print(f"⚠️ WARNING: Failed to load model bundle:\n{e}")
+from design import build_ui, load_user_settings
 
 
 # ================================================================
@@ -54,7 +32,15 @@ if os.path.exists(MODEL_PATH) and os.path.exists(VECTORIZER_PATH):
 import builtins
 message_store = getattr(builtins, "_shared_log_entries", [])     # Full message data entries
 log_widgets = []       # Track visible log widgets for filtering
+ui_dispatcher = None   # UIDispatcher: background threads reach Tk only through it
+ingest_recorder = None # IngestLogWriter when "ingest_record_path" is set
+ocr_cache_opened = False
+
+MAX_LOG_WIDGETS = 500       # Older entries leave the screen but stay in message_store
+LOG_WIDGETS_PER_TICK = 50   # Results beyond this in one update are summarized in one line
 network_manager = None
+classifier = None      # ClassificationExecutor, created with the UI
+ingest = None          # IngestQueue batching network messages for the classifier
 
 
 # ================================================================
@@ -106,7 +92,7 @@ def delete_single_log(entry, frame):
     try:
         if entry in message_store:
             message_store.remove(entry)
-        frame.destroy()
+        remove_log_message(frame)
         log_widgets[:] = [w for w in log_widgets if w["frame"] != frame]
         messagebox.showinfo("Deleted", "Log entry deleted.")
     except ValueError:
@@ -116,18 +102,21 @@ def delete_single_log(entry, frame):
 # ================================================================
 #                      LOGGING / DISPLAY
 # ================================================================
-def apply_filter(*_):
+def matches_filter(label):
     selected = filter_var.get()
+    return selected == "All" or (label or "").lower() == selected.lower()
+
+
+def apply_filter(*_):
     for w in log_widgets:
         f = w["frame"]
-        lbl = w["label"]
-        if selected == "All" or lbl.lower() == selected.lower():
+        if matches_filter(w["label"]):
             f.pack(fill="x", padx=5, pady=3)
         else:
             f.pack_forget()
 
 
-def add_log(message, label, warnings_list=None):
+def add_log(message, label, warnings_list=None, campaign=None):
     lbl = (label or "Info").lower()
     full_message = message or "System Message"
 
@@ -140,7 +129,7 @@ def add_log(message, label, warnings_list=None):
     }
     color = color_map.get(lbl, "#e0e0e0")
 
-    entry = {"message": message, "label": label, "warnings": warnings_list or []}
+    entry = {"message": message, "label": label, "warnings": warnings_list or [], "campaign": campaign}
     message_store.append(entry)
 
     frame = add_log_message(label, full_message, color, entry_data=entry)
@@ -157,48 +146,67 @@ def add_log(message, label, warnings_list=None):
 
     frame.bind("<Button-3>", show_context_menu)
     log_widgets.append({"frame": frame, "label": label})
-    apply_filter()
+
+    # Only this frame needs filtering; re-packing every log line made each add O(n)
+    if not matches_filter(label):
+        frame.pack_forget()
+    while len(log_widgets) > MAX_LOG_WIDGETS:
+        remove_log_message(log_widgets.pop(0)["frame"])
+
+
+def add_logs(entries):
+    """
+    Add many (message, label, warnings, campaign) results in one UI update.
+    During a burst only the newest LOG_WIDGETS_PER_TICK get their own line;
+    the rest are stored (and saved with the logs) behind one summary line.
+    """
+    hidden = entries[:-LOG_WIDGETS_PER_TICK] if len(entries) > LOG_WIDGETS_PER_TICK else []
+    if hidden:
+        for message, label, warnings_list, campaign in hidden:
+            message_store.append({"message": message, "label": label,
+                                  "warnings": warnings_list or [], "campaign": campaign})
+        counts = Counter(label for _, label, _, _ in hidden)
+        summary = ", ".join(f"{n} {label}" for label, n in counts.most_common())
+        add_log(f"{len(hidden)} more messages not shown ({summary}); they are included in saved logs.", "Info")
+    for entry in entries[len(hidden):]:
+        add_log(*entry)
 
 
 # ================================================================
 #                      PREDICTION LOGIC
 # ================================================================
 def process_message_for_prediction(text, source="Manual Input"):
-    global MODEL, VECTORIZER
-
-    if MODEL is None or VECTORIZER is None:
+    """Queue a message for classification; the verdict arrives in on_classified."""
+    if not engine.ensure_loaded():
         show_error_popup("Model Not Loaded", "Please ensure model files exist.")
         return
+    classifier.submit([text], source=source)
 
-    try:
-        urls = detect_urls(text)
-        emails = detect_emails(text)
-        phones = detect_phone_numbers(text)
-        domains = detect_domains(text)
 
-        cleaned = clean_text(text)
-        X = VECTORIZER.transform([cleaned])
-        raw_label = MODEL.predict(X)[0] if hasattr(MODEL, "predict") else "error"
+def on_classified(jobs):
+    """Runs on the Tk thread with every job finished since the last tick."""
+    network_entries = []
+    for job in jobs:
+        source = job["source"]
+        if job["error"] is not None:
+            if source == "Manual Input":
+                show_error_popup("Prediction Error", str(job["error"]))
+            add_log(f"Prediction failed for message from {source}: {job['error']}", "Error")
+            continue
 
-        label_map = {0: "ham", 1: "smishing", 2: "spam"}
-        raw_label = label_map.get(int(raw_label), str(raw_label))
-        display_label = "Legit" if raw_label.lower() == "ham" else raw_label.capitalize()
+        for text, source, result in zip(job["texts"], job["sources"], job["results"]):
+            display_label = engine.display_label(result["label"])
 
-        if display_label != "Legit" and source == "Manual Input":
-            verifier = UserVerification(root, text, display_label)
-            display_label = verifier.ask_user()
+            if source == "Manual Input":
+                if display_label != "Legit":
+                    verifier = UserVerification(root, text, display_label)
+                    display_label = verifier.ask_user()
+                add_log(text, display_label, result["warnings"], campaign=result["campaign"])
+            else:
+                network_entries.append((text, display_label, result["warnings"], result["campaign"]))
 
-        warnings = []
-        if urls: warnings.append("URLs: " + ", ".join(urls))
-        if emails: warnings.append("Emails: " + ", ".join(emails))
-        if phones: warnings.append("Phones: " + ", ".join(phones))
-        if domains: warnings.append("Domains: " + ", ".join(domains))
-
-        add_log(text, display_label, warnings)
-
-    except Exception as e:
-        show_error_popup("Prediction Error", str(e))
-        add_log(f"Prediction failed for message from {source}: {e}", "Error")
+    if network_entries:
+        add_logs(network_entries)
 
 
 def predict_action():
@@ -206,6 +214,10 @@ def predict_action():
     if not text or text == "Type here...":
         messagebox.showwarning("Warning", "Please enter a message first.")
         return
+    if not engine.ready.is_set():
+        # Still warming up: try again once the model is in memory
+        root.after(100, predict_action)
+        return
     process_message_for_prediction(text)
     clear_input()
 
@@ -213,26 +225,103 @@ def predict_action():
 # ================================================================
 #                      IMAGE OCR INPUT
 # ================================================================
+def open_ocr_cache():
+    """
+    First image: load the OCR modules and open the perceptual-hash OCR cache
+    ("ocr_cache_path", "" to disable; "ocr_cache_entries").
+    """
+    global ocr_cache_opened
+    if ocr_cache_opened:
+        return
+    from components import image_to_text  # cv2/OCR on first use
+    settings = load_user_settings()
+    image_to_text.set_cache(settings.get("ocr_cache_path", "ocr_cache.sqlite"),
+                            max_entries=settings.get("ocr_cache_entries", 5000))
+    ocr_cache_opened = True
+
+
 def load_image_to_input():
-    path = filedialog.askopenfilename(filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.bmp")])
-    if not path:
+    paths = filedialog.askopenfilenames(filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.bmp")])
+    if not paths:
+        return
+    open_ocr_cache()
+    if len(paths) > 1:
+        ocr_images_in_background(list(paths))
         return
 
     def insert_text(t):
         input_box.delete("1.0", "end")
         input_box.insert("end", t)
 
-    SMSCropper(root, path, insert_text)
+    def classify_bubbles(texts):
+        # Each bubble is its own message, logged with the file name as source
+        name = os.path.basename(paths[0])
+        classifier.submit(texts, source="Image", sources=[name] * len(texts))
+
+    from components.sms_cropper import SMSCropper  # cv2/OCR/PIL on first use
+    SMSCropper(root, paths[0], insert_text, on_messages=classify_bubbles)
+
+
+def ocr_images_in_background(paths):
+    """
+    Several screenshots at once: OCR them on a process pool and send each group
+    of finished images to the classifier as one job. Each bubble is a separate
+    message unless "ocr_split_bubbles" is false. Verdicts land in the log like
+    network messages, with the file name as the source.
+    """
+    from components.image_to_text import iter_ocr_batches  # cv2/OCR on first use
+    split_bubbles = load_user_settings().get("ocr_split_bubbles", True)
+
+    def run():
+        done = 0
+        try:
+            for batch in iter_ocr_batches(paths, bubbles=split_bubbles):
+                done += len({path for path, _, _ in batch})   # a bubble-split image gives several entries
+                readable = [(path, text) for path, text, error in batch if text]
+                for path, text, error in batch:
+                    if not text:
+                        reason = error or "no text detected"
+                        ui_dispatcher.call(add_log, f"OCR failed for {os.path.basename(path)}: {reason}", "Error")
+                if readable:
+                    classifier.submit([text for _, text in readable], source="Image",
+                                      sources=[os.path.basename(path) for path, _ in readable])
+                ui_dispatcher.call_latest("ocr_status", functools.partial(
+                    status_bar.configure, text=f"OCR: {done}/{len(paths)} images"))
+        except Exception as e:
+            ui_dispatcher.call(add_log, f"Batch OCR stopped: {e}", "Error")
+
+    status_bar.configure(text=f"OCR: 0/{len(paths)} images")
+    threading.Thread(target=run, daemon=True, name="Batch-OCR").start()
 
 
 # ================================================================
 #                      NETWORK
 # ================================================================
 def on_sms_received_callback(message):
-    text = message.get("message", "") if isinstance(message, dict) else str(message)
-    source = message.get("sender", "Network") if isinstance(message, dict) else "Network"
-    if text:
-        process_message_for_prediction(text, source)
+    """
+    Called from the receiver thread: queue the message for the next micro-batch.
+    Returns False when the queue is full, which pauses that connection.
+    """
+    if not isinstance(message, dict):
+        message = {"message": str(message)}
+    if not message.get("message"):
+        return True
+    return ingest.put(message)
+
+
+def classify_network_batch(messages):
+    """
+    Flusher-thread side of the ingest queue: one classifier job per micro-batch.
+    Clients that sent a request id get their verdict as soon as the job is done,
+    without waiting for the UI.
+    """
+    future = classifier.submit(
+        [m["message"] for m in messages],
+        source="Network",
+        sources=[m.get("sender") or "Network" for m in messages],
+    )
+    future.add_done_callback(functools.partial(reply_to_batch, messages))
+    return future
 
 
 def toggle_network():
@@ -241,12 +330,12 @@ def toggle_network():
         network_manager.stop_server()
         network_manager = None
         network_btn.configure(text="Toggle Network (OFF)")
-        add_log("Network server stopped.", "Info")
     else:
-        network_manager = NetworkSMSReceiver(PORT, on_sms_received_callback)
-        network_manager.start_server()
+        network_manager = NetworkSMSReceiver(root, on_sms_received_callback, add_log,
+                                             dispatcher=ui_dispatcher, recorder=ingest_recorder)
+        network_manager.set_ui_update_callback(lambda status: status_bar.configure(text=f"Network: {status}"))
+        network_manager.start_server(PORT)
         network_btn.configure(text="Toggle Network (ON)")
-        add_log(f"Network server listening on port {PORT}.", "Info")
 
 
 def manage_server_action():
@@ -318,59 +407,121 @@ def on_closing():
 
     if network_manager and getattr(network_manager, "is_running", False):
         network_manager.stop_server()
+    ingest.stop()
+    classifier.shutdown()
+    ui_dispatcher.stop()
+    if ingest_recorder:
+        ingest_recorder.close()
+    if ocr_cache_opened:
+        from components import image_to_text
+        image_to_text.set_cache(None)
 
     root.destroy()
 
 # ================================================================
 #                      INITIALIZE UI
 # ================================================================
-ui = build_ui()
+# Guarded so process-pool workers, which re-import this module on spawn
+# platforms, only get the functions and not a second window.
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    engine.warm_up()
+
+    ui = build_ui()
+
+    root = ui["root"]
+    input_box = ui["input_box"]
+    details_text = ui["details_text"]
+    filter_var = ui["filter_var"]
+    predict_btn = ui["predict_btn"]
+    clear_btn = ui["clear_btn"]
+    load_image_btn = ui["load_image_btn"]
+    manage_server_btn = ui["manage_server_btn"]
+    network_btn = ui["network_btn"]
+    add_log_message = ui["add_log_message"]
+    remove_log_message = ui["remove_log_message"]
+    status_bar = ui["status_bar"]
+
+    # ✅ Sync internal logs to global message_store
+    if "log_entries" in ui:
+        message_store = ui["log_entries"]
+
+    predict_btn.configure(command=predict_action)
+    clear_btn.configure(command=clear_input)
+    load_image_btn.configure(command=load_image_to_input)
+    manage_server_btn.configure(command=manage_server_action)
+    network_btn.configure(command=toggle_network)
+    filter_var.trace_add("write", apply_filter)
+
+    root.protocol("WM_DELETE_WINDOW", on_closing)
+
+    # Background threads (network receiver, OCR, classifier) update Tk only through this tick
+    ui_dispatcher = UIDispatcher(root)
+
+    # Classification runs on a worker pool; verdicts come back to on_classified.
+    # "classifier_pool" is "thread" (default) or "process" in user_settings.json.
+    settings = load_user_settings()
+    classifier = ClassificationExecutor(
+        ui_dispatcher, on_classified,
+        kind=settings.get("classifier_pool", "thread"),
+        max_workers=settings.get("classifier_workers", 2),
+    )
+    # Network messages reach the classifier in micro-batches
+    ingest = IngestQueue(
+        classify_network_batch,
+        batch_size=settings.get("ingest_batch_size", 256),
+        max_wait_ms=settings.get("ingest_max_wait_ms", 20),
+        max_depth=settings.get("ingest_max_depth", 10000),
+        policy=settings.get("ingest_policy", "block"),
+        spill_path=settings.get("ingest_spill_path", "ingest_spill.ndjson"),
+        on_shed=reply_shed,
+    )
+    ingest.start()
 
-root = ui["root"]
-input_box = ui["input_box"]
-details_text = ui["details_text"]
-filter_var = ui["filter_var"]
-predict_btn = ui["predict_btn"]
-clear_btn = ui["clear_btn"]
-load_image_btn = ui["load_image_btn"]
-manage_server_btn = ui["manage_server_btn"]
-network_btn = ui["network_btn"]
-add_log_message = ui["add_log_message"]
+    # "ocr_backend": "auto" (tesserocr when installed), "tesserocr" or "pytesseract"
+    ocr_backend.set_backend(settings.get("ocr_backend", "auto"))
 
-# ✅ Sync internal logs to global message_store
-if "log_entries" in ui:
-    message_store = ui["log_entries"]
+    # Optional record of all network traffic, for replay with tools/replay.py
+    if settings.get("ingest_record_path"):
+        ingest_recorder = IngestLogWriter(settings["ingest_record_path"])
 
-predict_btn.configure(command=predict_action)
-clear_btn.configure(command=clear_input)
-load_image_btn.configure(command=load_image_to_input)
-manage_server_btn.configure(command=manage_server_action)
-network_btn.configure(command=toggle_network)
-filter_var.trace_add("write", apply_filter)
+    def wait_for_engine():
+        """Keep Predict disabled until the background warm-up has finished."""
+        if engine.ready.is_set():
+            predict_btn.configure(state="normal")
+            total = engine.WARMUP_TIMINGS.get("total", 0.0)
+            status_bar.configure(text=f"Model ready ({total:.1f}s)")
+        else:
+            root.after(100, wait_for_engine)
 
-root.protocol("WM_DELETE_WINDOW", on_closing)
+    predict_btn.configure(state="disabled")
+    status_bar.configure(text="Loading model...")
+    wait_for_engine()
 
-# === Intro screen: show splash first, then reveal main UI ===
+    # === Intro screen: show splash first, then reveal main UI ===
 
-def show_main_ui():
-    """Show the main app window after the intro finishes."""
-    root.deiconify()
+    def show_main_ui():
+        """Show the main app window after the intro finishes."""
+        root.deiconify()
 
-def start_intro():
-    # Create intro and override its close behavior
-    intro = IntroScreen(root, duration=3000)
+    def start_intro():
+        # Create intro and override its close behavior
+        intro = IntroScreen(root, duration=3000)
 
-    # When the intro closes, call our function to show the UI
-    def on_intro_close():
-        intro.root.destroy()
-        show_main_ui()
+        # When the intro closes, call our function to show the UI
+        def on_intro_close():
+            intro.root.destroy()
+            show_main_ui()
 
-    intro._close = on_intro_close  # safely replace the close method
+        intro._close = on_intro_close  # safely replace the close method
+        # build_ui has already run: the main window can be used right away,
+        # with Predict enabled by wait_for_engine once the model is warm
+        intro.finish()
 
-# Hide the main window first
-root.withdraw()
+    # Hide the main window first
+    root.withdraw()
 
-# Start the intro after 100ms delay
-root.after(100, start_intro)
+    # Start the intro after 100ms delay
+    root.after(100, start_intro)
 
-root.mainloop()
+    root.mainloop()
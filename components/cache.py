@@ -0,0 +1,79 @@
+# components/cache.py
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def content_key(text: str, namespace: str = "raw") -> bytes:
+    """Content address of a message: namespace + 128-bit BLAKE2b of its UTF-8 bytes."""
+    digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    return namespace.encode("ascii") + b":" + digest
+
+
+class VerdictCache:
+    """
+    Bounded, thread-safe LRU cache with optional TTL, keyed by content hash.
+    Keeps hit/miss/eviction counters for monitoring.
+    """
+
+    def __init__(self, max_entries=50000, ttl=None):
+        """
+        :param max_entries: entries kept before the least recently used is evicted.
+        :param ttl: seconds an entry stays valid (None = no expiry).
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Cached value for key, or None. Refreshes its LRU position."""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
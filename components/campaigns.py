@@ -0,0 +1,182 @@
+# components/campaigns.py
+import time
+import zlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class Campaign:
+    """A group of near-duplicate messages sharing one representative signature."""
+
+    __slots__ = ("id", "signature", "verdict", "size", "example", "first_seen", "last_seen")
+
+    def __init__(self, campaign_id, signature, example=None):
+        self.id = campaign_id
+        self.signature = signature
+        self.verdict = None         # (label, score) of the first classified member
+        self.size = 1               # distinct messages that joined the campaign
+        self.example = example
+        self.first_seen = self.last_seen = time.time()
+
+
+class CampaignIndex:
+    """
+    In-memory MinHash/LSH index over word shingles of normalized (masked) text.
+
+    Messages whose estimated Jaccard similarity to a known campaign is at least
+    `threshold` join that campaign; otherwise they start a new one. The index
+    keeps at most `max_campaigns` campaigns and evicts the least recently seen.
+    Each campaign costs roughly 3.8 KB with the default bands (measured with
+    tools/bench_campaigns), so the default cap allows about 380 MB.
+    Messages with fewer than `min_words` words (keyword alert tags not
+    counted) are not indexed: "ok" or "URL" alone is not a campaign.
+    """
+
+    def __init__(self, num_perm=64, bands=32, threshold=0.4, shingle_size=2,
+                 max_campaigns=100000, seed=1, min_words=4):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.max_campaigns = max_campaigns
+        self.min_words = min_words
+
+        # Multiply-shift hash family: h(x) = (a * x + b) >> 32 over uint64, a odd
+        rng = np.random.default_rng(seed)
+        self._a = (rng.integers(0, 2**63, num_perm, dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+
+        self._campaigns = OrderedDict()              # id -> Campaign, LRU order
+        self._buckets = [{} for _ in range(bands)]   # per band: bucket key -> campaign id
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+        self.matches = 0
+        self.skipped = 0            # too short to index
+        self.created = 0
+        self.evictions = 0
+
+    # ---------- Signatures ----------
+    def shingles(self, text):
+        words = text.split()
+        k = self.shingle_size
+        if len(words) <= k:
+            return {" ".join(words)} if words else set()
+        return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+    def signature(self, text):
+        """MinHash signature (uint32 array of num_perm) of a normalized message."""
+        shingles = self.shingles(text)
+        if not shingles:
+            return np.zeros(self.num_perm, dtype=np.uint32)
+        x = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+        with np.errstate(over="ignore"):
+            hashed = (self._a[:, None] * x[None, :] + self._b[:, None]) >> np.uint64(32)
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        rows = signature.reshape(self.bands, self.rows)
+        return [hash(row.tobytes()) for row in rows]
+
+    @staticmethod
+    def similarity(sig_a, sig_b):
+        """Estimated Jaccard similarity of two signatures."""
+        return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+    # ---------- Lookup / insert ----------
+    def _find(self, signature, band_keys):
+        best, best_sim = None, self.threshold
+        seen = set()
+        for band, key in enumerate(band_keys):
+            campaign_id = self._buckets[band].get(key)
+            if campaign_id is None or campaign_id in seen:
+                continue
+            seen.add(campaign_id)
+            campaign = self._campaigns.get(campaign_id)
+            if campaign is None:
+                continue
+            sim = self.similarity(signature, campaign.signature)
+            if sim >= best_sim:
+                best, best_sim = campaign, sim
+        return best, best_sim
+
+    def lookup(self, text):
+        """(campaign, similarity) of the known campaign a normalized message belongs to, or (None, 0.0)."""
+        signature = self.signature(text)
+        with self._lock:
+            campaign, sim = self._find(signature, self._band_keys(signature))
+        return (campaign, sim) if campaign is not None else (None, 0.0)
+
+    def add(self, text, example=None):
+        """
+        Join the most similar campaign or start a new one.
+        Returns (campaign, similarity); a new campaign has similarity 1.0.
+        Texts shorter than min_words return (None, 0.0) and are not indexed.
+        """
+        if sum(1 for word in text.split() if not word.startswith("ALERT")) < self.min_words:
+            with self._lock:
+                self.skipped += 1
+            return None, 0.0
+        signature = self.signature(text)
+        band_keys = self._band_keys(signature)
+        with self._lock:
+            campaign, sim = self._find(signature, band_keys)
+            if campaign is not None:
+                campaign.size += 1
+                campaign.last_seen = time.time()
+                self._campaigns.move_to_end(campaign.id)
+                self.matches += 1
+                return campaign, sim
+
+            campaign = Campaign(self._next_id, signature, example)
+            self._next_id += 1
+            self._campaigns[campaign.id] = campaign
+            for band, key in enumerate(band_keys):
+                self._buckets[band].setdefault(key, campaign.id)
+            self.created += 1
+
+            while len(self._campaigns) > self.max_campaigns:
+                self._evict_oldest()
+            return campaign, 1.0
+
+    def _evict_oldest(self):
+        _, campaign = self._campaigns.popitem(last=False)
+        for band, key in enumerate(self._band_keys(campaign.signature)):
+            if self._buckets[band].get(key) == campaign.id:
+                del self._buckets[band][key]
+        self.evictions += 1
+
+    def get(self, campaign_id):
+        return self._campaigns.get(campaign_id)
+
+    def clear(self):
+        """Forget every campaign (ids keep counting up)."""
+        with self._lock:
+            self._campaigns.clear()
+            for bucket in self._buckets:
+                bucket.clear()
+
+    def __len__(self):
+        return len(self._campaigns)
+
+    def top(self, n=10):
+        """Largest live campaigns, biggest first."""
+        with self._lock:
+            return sorted(self._campaigns.values(), key=lambda c: c.size, reverse=True)[:n]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "campaigns": len(self._campaigns),
+                "max_campaigns": self.max_campaigns,
+                "buckets": sum(len(b) for b in self._buckets),
+                "matches": self.matches,
+                "skipped": self.skipped,
+                "created": self.created,
+                "evictions": self.evictions,
+            }
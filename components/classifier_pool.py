@@ -0,0 +1,97 @@
+# components/classifier_pool.py
+import threading
+import multiprocessing
+import traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from components import engine
+
+
+def classify_job(texts):
+    """
+    Worker-side job: classify a batch and attach the warning lines, which
+    need the worker's campaign index. Module-level so process pools can pickle it.
+    """
+    results = engine.classify_batch(texts)
+    for result in results:
+        result["warnings"] = engine.format_warnings(result)
+    return results
+
+
+def warm_worker():
+    """Process-pool initializer: load everything before the first job arrives."""
+    engine.ensure_loaded()
+    engine.preprocess.get_stopwords()
+    if engine.preprocess.LEMMATIZER == "spacy":
+        engine.preprocess.get_nlp()
+
+
+class ClassificationExecutor:
+    """
+    Runs classification jobs on a thread or process pool so spaCy/sklearn
+    never block the Tk event loop. Jobs can be submitted from any thread;
+    finished jobs are handed back to the Tk thread through the UIDispatcher,
+    all those of one tick in a single batch.
+    """
+
+    def __init__(self, dispatcher, on_results, kind="thread", max_workers=2):
+        """
+        :param dispatcher: UIDispatcher that delivers the results on the Tk thread.
+        :param on_results: called on the Tk thread with a list of finished jobs,
+                           each a dict with texts, source, sources, context, results and error.
+        :param kind: "thread" or "process".
+        :param max_workers: pool size.
+        """
+        self.dispatcher = dispatcher
+        self.on_results = on_results
+        self.kind = kind
+
+        if kind == "process":
+            # Spawn, not fork: the engine warm-up threads may be running, and a
+            # forked child could inherit one of their locks held and deadlock
+            self.pool = ProcessPoolExecutor(max_workers=max_workers, initializer=warm_worker,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        elif kind == "thread":
+            self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="Classifier")
+        else:
+            raise ValueError(f"Unknown executor kind: {kind}")
+
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.is_running = True
+
+    # ---------- Submission (any thread) ----------
+    def submit(self, texts, source="Manual Input", sources=None, context=None):
+        """
+        Queue a list of messages for classification. Returns the Future.
+        sources optionally gives a per-message source (e.g. the sender of each
+        message in a network batch); otherwise all messages share source.
+        """
+        texts = list(texts)
+        job = {"texts": texts, "source": source,
+               "sources": list(sources) if sources is not None else [source] * len(texts),
+               "context": context, "results": None, "error": None}
+        with self._lock:
+            self.in_flight += 1
+        future = self.pool.submit(classify_job, job["texts"])
+        future.add_done_callback(lambda f, job=job: self._on_done(job, f))
+        return future
+
+    def _on_done(self, job, future):
+        try:
+            job["results"] = future.result()
+        except Exception as e:
+            job["error"] = e
+            job["traceback"] = traceback.format_exc()
+        self.dispatcher.batch(self._deliver, job)
+
+    # ---------- Delivery (Tk thread) ----------
+    def _deliver(self, jobs):
+        with self._lock:
+            self.in_flight -= len(jobs)
+        if self.is_running:
+            self.on_results(jobs)
+
+    def shutdown(self, wait=False):
+        self.is_running = False
+        self.pool.shutdown(wait=wait, cancel_futures=True)
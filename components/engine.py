@@ -0,0 +1,428 @@
+# components/engine.py
+"""
+Headless classification engine.
+
+Owns the model bundle, preprocessing, feature extraction and label mapping
+so the detector can run without Tk (workers, servers, scripts). app.py is a
+thin client of this module.
+
+Nothing heavy is loaded at import: the model bundle, NLTK stopwords and
+spaCy load on first use, or in the background through warm_up().
+
+Headless usage (one message per line on stdin, JSON results on stdout):
+    python -m components.engine < messages.txt
+"""
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+import threading
+import numpy as np
+
+from components import preprocess
+from components.preprocess import normalize_text, lemmatize_texts
+from components.cache import VerdictCache, content_key
+from components.campaigns import CampaignIndex
+from components.feature_extraction import (
+    detect_urls, detect_emails, detect_phone_numbers, detect_domains
+)
+
+
+# ================================================================
+#                      RESOURCE PATH
+# ================================================================
+def resource_path(relative_path: str) -> str:
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+
+# ================================================================
+#                      MODEL LOADING
+# ================================================================
+MODEL_PATH = resource_path("sms_model.joblib")
+VECTORIZER_PATH = resource_path("tfidf_vectorizer.joblib")
+# Built by tools/build_lemma_table.py; only needed for the "lookup" lemmatizer
+LEMMA_TABLE_PATH = resource_path("lemma_lookup.json.gz")
+
+LABEL_MAP = {0: "ham", 1: "smishing", 2: "spam"}
+
+# spaCy batching for classify_batch; NLP_PROCESSES > 1 spreads lemmatization
+# over worker processes for large batches.
+NLP_BATCH_SIZE = 256
+NLP_PROCESSES = 1
+
+MODEL = None
+VECTORIZER = None
+
+# Campaign bursts repeat the same text thousands of times, so verdicts are
+# cached by content hash of the raw text and of its normalized form.
+# Set CACHE = None to disable.
+CACHE = VerdictCache(max_entries=50000, ttl=3600)
+
+# Near-duplicate campaign variants (different name, tracking number, short
+# link) are grouped by campaign; those at least CAMPAIGN_REUSE_SIMILARITY
+# similar reuse the verdict of the campaign's first classified message.
+# Set CAMPAIGNS = None to disable. 20,000 campaigns take about 75 MB.
+CAMPAIGNS = CampaignIndex(max_campaigns=20000)
+CAMPAIGN_REUSE_SIMILARITY = 0.7
+
+# The bundle files are stat()ed at most this often; a changed file reloads
+# the model and drops every cached verdict.
+BUNDLE_CHECK_INTERVAL = 2.0
+
+_bundle_paths = None
+_bundle_fingerprint = None
+_last_bundle_check = 0.0
+
+
+def _fingerprint(paths):
+    return tuple((st.st_mtime_ns, st.st_size) for st in map(os.stat, paths))
+
+
+def load_model(model_path=MODEL_PATH, vectorizer_path=VECTORIZER_PATH):
+    """
+    Load the joblib bundle. Returns True when both files loaded.
+    On failure the previously loaded model (if any) stays in use.
+    """
+    global MODEL, VECTORIZER, _bundle_paths, _bundle_fingerprint
+
+    if not (os.path.exists(model_path) and os.path.exists(vectorizer_path)):
+        return False
+    try:
+        import joblib
+        fingerprint = _fingerprint((model_path, vectorizer_path))
+        model = joblib.load(model_path)
+        vectorizer = joblib.load(vectorizer_path)
+    except Exception as e:
+        # e.g. a bundle still being copied: keep the fingerprint, so the
+        # next _check_bundle tries again
+        print(f"⚠️ WARNING: Failed to load model bundle:\n{e}")
+        return False
+
+    MODEL, VECTORIZER = model, vectorizer
+    _bundle_paths = (model_path, vectorizer_path)
+    _bundle_fingerprint = fingerprint
+    _reset_verdicts()
+    return True
+
+
+def _reset_verdicts():
+    """Forget every verdict made with the previous model/preprocessing."""
+    global CAMPAIGNS
+    if CACHE is not None:
+        CACHE.clear()
+    if CAMPAIGNS is not None:
+        CAMPAIGNS = CampaignIndex(
+            num_perm=CAMPAIGNS.num_perm, bands=CAMPAIGNS.bands,
+            threshold=CAMPAIGNS.threshold, shingle_size=CAMPAIGNS.shingle_size,
+            max_campaigns=CAMPAIGNS.max_campaigns, min_words=CAMPAIGNS.min_words,
+        )
+
+
+def _check_bundle():
+    """Reload the model if its files changed on disk since they were loaded."""
+    global _last_bundle_check
+
+    now = time.monotonic()
+    if _bundle_paths is None or now - _last_bundle_check < BUNDLE_CHECK_INTERVAL:
+        return
+    _last_bundle_check = now
+    try:
+        changed = _fingerprint(_bundle_paths) != _bundle_fingerprint
+    except OSError:
+        return  # Files are being replaced; keep serving the loaded model
+    if changed:
+        print("Model bundle changed on disk, reloading.")
+        load_model(*_bundle_paths)
+
+
+def is_loaded():
+    return MODEL is not None and VECTORIZER is not None
+
+
+_load_lock = threading.Lock()
+_load_attempted = False
+
+
+def ensure_loaded():
+    """Load the bundle on first use. Returns is_loaded(); a failed load is not retried."""
+    global _load_attempted
+    if not is_loaded() and not _load_attempted:
+        with _load_lock:
+            if not _load_attempted:
+                load_model()
+                _load_attempted = True
+    return is_loaded()
+
+
+def set_lemmatizer(mode, table_path=LEMMA_TABLE_PATH):
+    """
+    "spacy" (default) or "lookup": the precomputed lemma table, which skips
+    loading spaCy entirely. Returns False and keeps spaCy if the table is missing.
+    """
+    try:
+        preprocess.set_lemmatizer(mode, table_path)
+    except FileNotFoundError:
+        print(f"⚠️ WARNING: Lemma table not found at {table_path}, using spaCy.")
+        return False
+    _reset_verdicts()
+    return True
+
+
+
+# ================================================================
+#                      LABELS
+# ================================================================
+def map_label(raw_label):
+    try:
+        return LABEL_MAP.get(int(raw_label), str(raw_label))
+    except (TypeError, ValueError):
+        return str(raw_label)
+
+
+def display_label(label):
+    """'ham' -> 'Legit', everything else capitalized for the UI."""
+    return "Legit" if label.lower() == "ham" else label.capitalize()
+
+
+def format_warnings(result):
+    """Human-readable indicator lines for a classification result."""
+    warnings = []
+    if result["urls"]: warnings.append("URLs: " + ", ".join(result["urls"]))
+    if result["emails"]: warnings.append("Emails: " + ", ".join(result["emails"]))
+    if result["phones"]: warnings.append("Phones: " + ", ".join(result["phones"]))
+    if result["domains"]: warnings.append("Domains: " + ", ".join(result["domains"]))
+    campaign = CAMPAIGNS.get(result.get("campaign")) if CAMPAIGNS is not None else None
+    if campaign is not None and campaign.size > 1:
+        warnings.append(f"Campaign: #{campaign.id} ({campaign.size} similar messages)")
+    return warnings
+
+
+# ================================================================
+#                      CLASSIFICATION
+# ================================================================
+def _ovo_margins(X, predictions):
+    """
+    Smallest one-vs-one SVM margin of the predicted class against every other
+    class: how far the message is from the nearest boundary that would change
+    the verdict. About 0 = on a boundary; negative = a narrow, contested win.
+    """
+    ovo = copy.copy(MODEL)      # shallow: shares the fitted arrays
+    ovo.decision_function_shape = "ovo"
+    decision = np.asarray(ovo.decision_function(X))
+    classes = list(MODEL.classes_)
+    predicted = np.array([classes.index(p) for p in predictions])
+    margins = np.full(len(predicted), np.inf)
+    # Columns are the pairs (i, j), i < j, in classes_ order; > 0 favours i
+    column = 0
+    for i in range(len(classes)):
+        for j in range(i + 1, len(classes)):
+            margins = np.where(predicted == i, np.minimum(margins, decision[:, column]), margins)
+            margins = np.where(predicted == j, np.minimum(margins, -decision[:, column]), margins)
+            column += 1
+    return margins
+
+
+def _prediction_scores(X, predictions):
+    """
+    Score of the predicted class for every row of X: a probability when the
+    model has predict_proba, otherwise an uncalibrated SVM margin (see
+    _ovo_margins). Margins only rank messages; they are not probabilities.
+    """
+    if hasattr(MODEL, "predict_proba") and getattr(MODEL, "probability", True):
+        return MODEL.predict_proba(X).max(axis=1)
+    if hasattr(MODEL, "decision_function"):
+        if len(getattr(MODEL, "classes_", ())) > 2 and hasattr(MODEL, "decision_function_shape"):
+            # The "ovr" shape of a multi-class SVC is mostly its vote count
+            return _ovo_margins(X, predictions)
+        decision = np.asarray(MODEL.decision_function(X))
+        if decision.ndim == 1:
+            # Binary models return one margin per row; its magnitude is the confidence
+            return np.abs(decision)
+        return decision.max(axis=1)
+    return np.ones(len(predictions))
+
+
+def _indicators(text):
+    return {
+        "urls": detect_urls(text),
+        "emails": detect_emails(text),
+        "phones": detect_phone_numbers(text),
+        "domains": detect_domains(text),
+    }
+
+
+def classify_batch(texts, n_process=None):
+    """
+    Classify many messages at once: one nlp.pipe run, one sparse transform
+    and one predict call for the whole batch instead of one per message.
+    Repeated texts (in the batch or in CACHE) are only classified once and
+    near-duplicates of a known campaign reuse its verdict.
+    Returns one dict per input text with label, score, campaign id and
+    detected indicators.
+    """
+    if not ensure_loaded():
+        raise RuntimeError("Model not loaded. Please ensure model files exist.")
+
+    texts = [t if isinstance(t, str) else str(t) for t in texts]
+    if not texts:
+        return []
+
+    _check_bundle()
+    cache = CACHE
+    campaigns = CAMPAIGNS
+
+    # Raw-text cache entries hold the full result; normalized-text entries hold
+    # (label, score, campaign), shared by variants that only differ before
+    # normalization.
+    results = {}
+    pending = {}    # normalized text -> raw texts waiting for a verdict
+    pending_campaigns = {}
+    for text in dict.fromkeys(texts):
+        hit = cache.get(content_key(text)) if cache is not None else None
+        if hit is not None:
+            results[text] = hit
+            continue
+        normalized = normalize_text(text)
+        if normalized in pending:
+            pending[normalized].append(text)
+            continue
+        verdict = cache.get(content_key(normalized, "norm")) if cache is not None else None
+        if verdict is None and campaigns is not None:
+            campaign, similarity = campaigns.add(normalized, example=text)
+            if campaign is None:
+                pass    # Too short to belong to a campaign
+            elif campaign.verdict is not None and similarity >= CAMPAIGN_REUSE_SIMILARITY:
+                verdict = campaign.verdict + (campaign.id,)
+                if cache is not None:
+                    cache.put(content_key(normalized, "norm"), verdict)
+            else:
+                pending_campaigns[normalized] = campaign
+        if verdict is not None:
+            results[text] = _make_result(text, verdict, cache)
+        else:
+            pending[normalized] = [text]
+
+    if pending:
+        normalized = list(pending)
+        cleaned = lemmatize_texts(normalized, NLP_BATCH_SIZE, n_process or NLP_PROCESSES)
+        X = VECTORIZER.transform(cleaned)
+        predictions = MODEL.predict(X)
+        scores = _prediction_scores(X, predictions)
+        for norm, raw_label, score in zip(normalized, predictions, scores):
+            campaign = pending_campaigns.get(norm)
+            if campaign is not None and campaign.verdict is None:
+                campaign.verdict = (map_label(raw_label), float(score))
+            verdict = (map_label(raw_label), float(score), campaign.id if campaign is not None else None)
+            if cache is not None:
+                cache.put(content_key(norm, "norm"), verdict)
+            for text in pending[norm]:
+                results[text] = _make_result(text, verdict, cache)
+
+    return [dict(results[text]) for text in texts]
+
+
+def _make_result(text, verdict, cache):
+    label, score, campaign_id = verdict
+    result = {"text": text, "label": label, "score": score, "campaign": campaign_id, **_indicators(text)}
+    if cache is not None:
+        cache.put(content_key(text), result)
+    return result
+
+
+def cache_stats():
+    return CACHE.stats() if CACHE is not None else {}
+
+
+def campaign_stats():
+    return CAMPAIGNS.stats() if CAMPAIGNS is not None else {}
+
+
+def classify(text):
+    """Single-message convenience wrapper around classify_batch."""
+    return classify_batch([text])[0]
+
+
+# ================================================================
+#                      WARM-UP
+# ================================================================
+ready = threading.Event()     # Set once warm_up() finished loading everything
+WARMUP_TIMINGS = {}           # resource name -> seconds it took to load
+
+
+def warm_up(on_ready=None):
+    """
+    Load the model bundle, stopwords and (in spaCy mode) the spaCy pipeline
+    in parallel on background threads. Returns the `ready` Event, which is
+    set, and on_ready() called from the warm-up thread, once all are done.
+    """
+    tasks = {"model bundle": ensure_loaded, "stopwords": preprocess.get_stopwords}
+    if preprocess.LEMMATIZER == "spacy":
+        tasks["spaCy"] = preprocess.get_nlp
+
+    def run(name, func):
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            print(f"⚠️ WARNING: Failed to warm up {name}:\n{e}")
+        WARMUP_TIMINGS[name] = time.perf_counter() - start
+
+    def run_all():
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=run, args=(name, func), daemon=True, name=f"Warmup-{name}")
+            for name, func in tasks.items()
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        WARMUP_TIMINGS["total"] = time.perf_counter() - start
+        ready.set()
+        if on_ready:
+            on_ready()
+
+    threading.Thread(target=run_all, daemon=True, name="Warmup").start()
+    return ready
+
+
+# ================================================================
+#                      HEADLESS ENTRY POINT
+# ================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify SMS messages read from stdin, one per line.")
+    parser.add_argument("--batch-size", type=int, default=4096, help="messages per classify_batch call")
+    parser.add_argument("--processes", type=int, default=NLP_PROCESSES, help="spaCy worker processes")
+    parser.add_argument("--lemmatizer", choices=["spacy", "lookup"], default="spacy")
+    args = parser.parse_args(argv)
+
+    if args.lemmatizer != "spacy":
+        set_lemmatizer(args.lemmatizer)
+
+    if not ensure_loaded():
+        print("Model not loaded. Please ensure model files exist.", file=sys.stderr)
+        return 1
+
+    batch = []
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        batch.append(line)
+        if len(batch) >= args.batch_size:
+            for result in classify_batch(batch, n_process=args.processes):
+                print(json.dumps(result, ensure_ascii=False))
+            batch = []
+    for result in classify_batch(batch, n_process=args.processes):
+        print(json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
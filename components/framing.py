@@ -0,0 +1,182 @@
+# components/framing.py
+"""
+Wire format for messages sent to the network receiver.
+
+Two kinds of frame can be mixed on one connection:
+
+* Line frames: UTF-8 text terminated by b"\\n" (a trailing b"\\r" is ignored).
+  A line that is a JSON object is used as-is, e.g.
+  {"sender": "+905551112233", "message": "Your parcel is waiting..."};
+  any other line is taken as the SMS text itself.
+* Binary frames: a 0x00 marker byte, a 4-byte big-endian payload length and
+  the payload. The payload follows the same JSON-object-or-text rule, but
+  may contain newlines and needs no escaping.
+
+Every decoded frame is a dict with at least a "message" key, the shape
+on_sms_received_callback expects.
+
+Datagram transports (UDP) carry whole frames: one datagram holds one or
+more frames, and a final line does not need its newline.
+"""
+import json
+import struct
+
+BINARY_MARKER = 0x00
+HEADER = struct.Struct(">BI")       # marker, payload length
+MAX_FRAME_SIZE = 1 << 20            # 1 MiB; larger frames close the connection
+
+
+class FrameError(ValueError):
+    """The peer sent something that cannot be framed (oversized frame)."""
+
+
+def parse_payload(text):
+    """Frame text -> message dict: a JSON object as-is, anything else as the SMS text."""
+    if text[:1] == "{":
+        try:
+            obj = json.loads(text)
+        except ValueError:
+            obj = None
+        if isinstance(obj, dict):
+            if "message" not in obj:
+                obj["message"] = ""
+            elif not isinstance(obj["message"], str):
+                obj["message"] = str(obj["message"])
+            return obj
+    return {"message": text}
+
+
+# ---------- Encoding ----------
+def _payload_bytes(payload):
+    if isinstance(payload, dict):
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if isinstance(payload, str):
+        return payload.encode("utf-8")
+    return bytes(payload)
+
+
+def encode_line(payload):
+    """Line frame for a dict (JSON) or text. Text must not contain a newline."""
+    data = _payload_bytes(payload)
+    if b"\n" in data:
+        raise FrameError("line frames cannot contain newlines; use encode_binary")
+    return data + b"\n"
+
+
+def encode_binary(payload):
+    """Length-prefixed binary frame for a dict (JSON), text or bytes."""
+    data = _payload_bytes(payload)
+    if len(data) > MAX_FRAME_SIZE:
+        raise FrameError(f"frame of {len(data)} bytes exceeds {MAX_FRAME_SIZE}")
+    return HEADER.pack(BINARY_MARKER, len(data)) + data
+
+
+# ---------- Decoding ----------
+class FrameDecoder:
+    """
+    Incremental decoder for one connection. Bytes go into a single reusable
+    bytearray; only complete frames are decoded, so a message split across
+    reads (or a UTF-8 character cut in half) is simply completed by the next
+    read, and several frames in one read all come out.
+    """
+
+    def __init__(self, max_frame_size=MAX_FRAME_SIZE):
+        self.max_frame_size = max_frame_size
+        self._buf = bytearray()
+        self._pos = 0           # start of the first undecoded byte
+        self._scan = 0          # where the newline search resumes in a partial line
+        self.frames = 0
+        self.framed = False     # a newline-terminated or binary frame has been seen
+
+    @property
+    def pending(self):
+        """Bytes received but not yet part of a complete frame."""
+        return len(self._buf) - self._pos
+
+    @property
+    def legacy_pending(self):
+        """
+        Whether the pending bytes look like bare text from a legacy client
+        that never terminates its messages: nothing on this connection has
+        been framed yet, and they are not the start of a JSON object or a
+        binary frame (those are incomplete, not unterminated).
+        """
+        if not self.pending or self.framed:
+            return False
+        return self._buf[self._pos] not in (BINARY_MARKER, ord("{"))
+
+    def feed(self, data):
+        """Add received bytes; return the list of message dicts they completed."""
+        self._buf += data
+        messages = []
+        buf = self._buf
+        with memoryview(buf) as view:
+            while self._pos < len(buf):
+                pos = self._pos
+                if buf[pos] == BINARY_MARKER:
+                    if len(buf) - pos < HEADER.size:
+                        break
+                    _, length = HEADER.unpack_from(buf, pos)
+                    if length > self.max_frame_size:
+                        raise FrameError(f"binary frame of {length} bytes exceeds {self.max_frame_size}")
+                    end = pos + HEADER.size + length
+                    if len(buf) < end:
+                        break
+                    messages.append(self._decode(view[pos + HEADER.size:end]))
+                    self._pos = end
+                    self.framed = True
+                else:
+                    newline = buf.find(b"\n", max(pos, self._scan))
+                    if newline < 0:
+                        if len(buf) - pos > self.max_frame_size:
+                            raise FrameError(f"line longer than {self.max_frame_size} bytes")
+                        self._scan = len(buf)
+                        break
+                    end = newline - 1 if newline > pos and buf[newline - 1] == 0x0D else newline
+                    if end > pos:
+                        messages.append(self._decode(view[pos:end]))
+                    self._pos = newline + 1
+                    self.framed = True
+        self._compact()
+        return messages
+
+    def flush(self):
+        """
+        Treat a trailing unterminated line as a complete frame (EOF, or a
+        legacy client that sends bare text without a newline). Incomplete
+        binary frames are kept.
+        """
+        if not self.pending or self._buf[self._pos] == BINARY_MARKER:
+            return []
+        with memoryview(self._buf) as view:
+            end = len(self._buf)
+            if self._buf[end - 1] == 0x0D:
+                end -= 1
+            messages = [self._decode(view[self._pos:end])] if end > self._pos else []
+        self._pos = len(self._buf)
+        self._compact()
+        return messages
+
+    def _decode(self, view):
+        self.frames += 1
+        return parse_payload(str(view, "utf-8", "replace").strip())
+
+    def _compact(self):
+        # Drop consumed bytes once they are the larger part of the buffer
+        if self._pos == len(self._buf):
+            del self._buf[:]
+            self._pos = self._scan = 0
+        elif self._pos > len(self._buf) // 2:
+            del self._buf[:self._pos]
+            self._scan = max(0, self._scan - self._pos)
+            self._pos = 0
+
+
+def decode_datagram(data, max_frame_size=MAX_FRAME_SIZE):
+    """All frames in one self-contained datagram. Raises FrameError if a binary frame is cut short."""
+    decoder = FrameDecoder(max_frame_size)
+    messages = decoder.feed(data)
+    messages += decoder.flush()
+    if decoder.pending:
+        raise FrameError("datagram ends inside a binary frame")
+    return messages
@@ -0,0 +1,302 @@
+# components/http_server.py
+"""
+Minimal HTTP/1.1 JSON endpoint on asyncio (stdlib only), feeding the same
+dispatch path as the TCP receiver.
+
+    POST /classify        {"message": "...", "sender": "..."}  ->  {"label", "score", "campaign", "indicators"}
+    POST /classify/batch  {"messages": ["...", ...]}           ->  {"results": [...]}
+    GET  /stats                                                ->  server counters
+
+"score" is described in components.server: an SVM margin, not a probability.
+
+Connections are persistent (keep-alive) unless the client asks to close.
+Every message is handed to dispatch(message) with a "reply" callable,
+exactly like a framed TCP request, so HTTP traffic is micro-batched and
+backpressured together with socket traffic.
+"""
+import json
+import time
+import asyncio
+import threading
+import traceback
+from collections import deque
+
+HTTP_HOST = "127.0.0.1"
+HTTP_PORT = 8765
+MAX_BODY_SIZE = 8 << 20     # 8 MiB
+MAX_BATCH = 10000           # messages per /classify/batch request
+KEEPALIVE_TIMEOUT = 30      # seconds an idle persistent connection stays open
+REQUEST_TIMEOUT = 30        # seconds a request may wait for queue room and verdicts
+PAUSE_INTERVAL = 0.01       # seconds between retries while dispatch refuses messages
+LATENCY_HISTORY = 10000
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           411: "Length Required", 413: "Payload Too Large", 431: "Request Header Fields Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, close=False):
+        """:param close: the rest of the stream cannot be framed; end the connection."""
+        super().__init__(message)
+        self.status = status
+        self.close = close
+
+
+class HTTPClassifyServer:
+    """Runs the HTTP endpoint on its own thread and event loop."""
+
+    def __init__(self, dispatch, port=HTTP_PORT, host=HTTP_HOST, log_callback=None, stats_callback=None,
+                 recorder=None):
+        """
+        :param dispatch: dispatch(message_dict) -> False when full (retried), like IngestQueue.put.
+        :param log_callback: optional log_callback(text, label); called from the server thread.
+        :param stats_callback: optional function whose dict is served at GET /stats
+                               (default: this server's own counters).
+        :param recorder: optional IngestLogWriter that gets every classified message.
+        """
+        self.dispatch = dispatch
+        self.port = port
+        self.host = host
+        self.log_callback = log_callback
+        self.stats_callback = stats_callback
+        self.recorder = recorder
+
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self._stopped = None
+        self._tasks = set()
+        self.is_running = False
+        self.listening = threading.Event()  # set once bound (or failed to bind)
+
+        self.requests = 0
+        self.statuses = {}
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+
+    def _log(self, text, label="Info"):
+        if self.log_callback:
+            self.log_callback(text, label)
+
+    # ---------- Server Control ----------
+    def start_server(self):
+        if self.is_running:
+            return
+        self.is_running = True
+        self.listening.clear()
+        self.thread = threading.Thread(target=self._run_server_thread, daemon=True, name="HTTP-Server-Thread")
+        self.thread.start()
+
+    def stop_server(self):
+        if not self.is_running:
+            return
+        self.is_running = False
+        if self.loop and self._stopped:
+            try:
+                self.loop.call_soon_threadsafe(self._stopped.set)
+            except RuntimeError:
+                pass  # Loop already closed
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2)
+        self.thread = None
+
+    def _run_server_thread(self):
+        try:
+            asyncio.run(self._serve())
+        except Exception as e:
+            if self.is_running:
+                self._log(f"HTTP server error: {e}\n{traceback.format_exc()}", "Error")
+        finally:
+            self.is_running = False
+            self.loop = None
+            self.listening.set()
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        if not self.is_running:
+            return
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.port, reuse_address=True)
+        self.port = self.server.sockets[0].getsockname()[1]   # the real port when 0 was asked for
+        self.listening.set()
+        self._log(f"HTTP server listening on http://{self.host}:{self.port}", "Info")
+        try:
+            await self._stopped.wait()
+        finally:
+            self.server.close()
+            for task in list(self._tasks):
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        pick = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+        return {
+            "requests": self.requests,
+            "statuses": dict(self.statuses),
+            "latency_ms_p50": pick(0.5),
+            "latency_ms_p95": pick(0.95),
+            "latency_ms_p99": pick(0.99),
+        }
+
+    # ---------- Connection Handling ----------
+    async def _handle_client(self, reader, writer):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            keep_alive = True
+            while keep_alive and self.is_running:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return  # Client closed or went idle between requests
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 431, {"error": "headers too large"}, keep_alive=False)
+                    return
+
+                started = time.monotonic()
+                try:
+                    method, path, version, headers = self._parse_head(head)
+                    keep_alive = self._wants_keep_alive(version, headers)
+                    body = await self._read_body(reader, headers)
+                    status, payload = 200, await self._route(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                    keep_alive = keep_alive and not e.close and e.status < 500 and e.status not in (411, 413, 431)
+                except asyncio.IncompleteReadError:
+                    return
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+                    self._log(f"HTTP handler error: {e}", "Error")
+
+                await self._send(writer, status, payload, keep_alive)
+                self.requests += 1
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+                self.latencies.append(time.monotonic() - started)
+        except (asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            self._tasks.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _parse_head(head):
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, path, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        return method.upper(), path.split("?", 1)[0], version.upper(), headers
+
+    @staticmethod
+    def _wants_keep_alive(version, headers):
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    @staticmethod
+    async def _read_body(reader, headers):
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HTTPError(411, "chunked bodies are not supported; send Content-Length")
+        value = headers.get("content-length", "").strip()
+        # Digits only: int() would also take "-5", "+5" and "1_000"
+        if value and not (value.isascii() and value.isdigit()):
+            raise HTTPError(400, "invalid Content-Length", close=True)
+        length = int(value or 0)
+        if length > MAX_BODY_SIZE:
+            raise HTTPError(413, f"body larger than {MAX_BODY_SIZE} bytes")
+        return await reader.readexactly(length) if length else b""
+
+    async def _send(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    # ---------- Routes ----------
+    async def _route(self, method, path, body):
+        if path == "/stats":
+            if method != "GET":
+                raise HTTPError(405, "use GET")
+            return self.stats_callback() if self.stats_callback else {"http": self.stats()}
+
+        if path not in ("/classify", "/classify/batch"):
+            raise HTTPError(404, f"no route for {path}")
+        if method != "POST":
+            raise HTTPError(405, "use POST")
+        try:
+            data = json.loads(body or b"null")
+        except ValueError:
+            raise HTTPError(400, "body is not valid JSON")
+
+        if path == "/classify":
+            if not isinstance(data, dict) or not isinstance(data.get("message"), str) or not data["message"]:
+                raise HTTPError(400, 'expected {"message": "<non-empty text>"}')
+            result = (await self._classify([data]))[0]
+            if "error" in result:
+                raise HTTPError(503 if result["error"].startswith("overloaded") else 500, result["error"])
+            return result
+
+        messages = data.get("messages") if isinstance(data, dict) else data
+        if not isinstance(messages, list) or not all(isinstance(m, (str, dict)) for m in messages):
+            raise HTTPError(400, 'expected {"messages": ["<text>", ...]}')
+        if len(messages) > MAX_BATCH:
+            raise HTTPError(413, f"more than {MAX_BATCH} messages")
+        messages = [m if isinstance(m, dict) else {"message": m} for m in messages]
+        return {"results": await self._classify(messages)}
+
+    async def _classify(self, messages):
+        """Dispatch messages with reply hooks and wait for every verdict."""
+        deadline = time.monotonic() + REQUEST_TIMEOUT
+        futures = []
+        for message in messages:
+            text = message.get("message")
+            future = self.loop.create_future()
+            futures.append(future)
+            if not isinstance(text, str) or not text:
+                future.set_result({"error": "empty message"})
+                continue
+            item = {k: v for k, v in message.items() if k != "reply"}
+            if self.recorder is not None:
+                self.recorder.record(item)
+            item["reply"] = self._replier(future)
+            while self.dispatch(item) is False:
+                if time.monotonic() > deadline:
+                    raise HTTPError(503, "classification queue is full")
+                await asyncio.sleep(PAUSE_INTERVAL)
+        try:
+            return await asyncio.wait_for(asyncio.gather(*futures), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise HTTPError(504, "timed out waiting for verdicts")
+
+    def _replier(self, future):
+        loop = self.loop
+
+        def reply(payload):
+            try:
+                loop.call_soon_threadsafe(_resolve, future, payload)
+            except RuntimeError:
+                pass  # Server stopped
+        return reply
+
+
+def _resolve(future, payload):
+    if not future.done():
+        future.set_result(payload)
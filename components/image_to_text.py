@@ -1,13 +1,228 @@
 # image_to_text.py
 from PIL import Image, ImageOps
-import pytesseract
-import platform
+import os
+import threading
+import multiprocessing
 import cv2
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+
+from components import ocr_backend
+from components.ocr_cache import OCRCache
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+OCR_QUEUE_PER_WORKER = 4    # images submitted ahead per worker, so a huge folder is not all queued at once
+
+# Bubble detection, as fractions of the screenshot size
+BUBBLE_MIN_WIDTH = 0.10     # narrower blobs are icons, timestamps, ticks
+BUBBLE_MAX_WIDTH = 0.97     # full-width blocks are headers, input bars, keyboards
+BUBBLE_MIN_HEIGHT = 0.015
+HEADER_HEIGHT = 0.08        # blocks inside the top strip are the status bar and contact name
+INPUT_BAR_HEIGHT = 0.06     # blocks starting in the bottom strip are the compose box
+BUBBLE_PADDING = 6          # pixels kept around each bubble for OCR
+BUBBLE_OCR_THREADS = 4
+
+CACHE = None                # OCRCache once set_cache() is called; None = always OCR
+
+# Bubble OCR threads live as long as the process, so each keeps its OCR
+# engine (ocr_backend holds one per thread) instead of loading a new one
+_bubble_pools = {}          # size -> ThreadPoolExecutor
+_bubble_pools_lock = threading.Lock()
+
+
+class OCRCancelled(Exception):
+    """OCR was stopped through its cancel event before it finished."""
+
+
+def set_cache(path, max_entries=5000):
+    """Look up screenshots by perceptual hash before OCR'ing them (None disables)."""
+    global CACHE
+    if CACHE is not None:
+        CACHE.close()
+    CACHE = OCRCache(path, max_entries=max_entries) if path else None
+
+
+def text_mask(gray):
+    """Adaptive threshold plus noise removal: white text/edges on black."""
+    thresh = cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+        cv2.THRESH_BINARY_INV, 11, 2
+    )
+    return cv2.morphologyEx(thresh, cv2.MORPH_OPEN, np.ones((2,2), np.uint8))
+
+
+def preprocess_image(img):
+    """
+    Keep mainly the SMS bubbles' text: adaptive threshold, then remove
+    small noise. Returns a PIL image ready for OCR.
+    """
+    # Convert to grayscale
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+    # Adaptive threshold to highlight text, small noise removed
+    clean = text_mask(gray)
+
+    # Invert back to normal
+    processed = cv2.bitwise_not(clean)
+
+    # Convert back to PIL Image
+    return Image.fromarray(processed)
+
+
+# ================================================================
+#                      BUBBLE DETECTION
+# ================================================================
+def find_bubbles(img):
+    """
+    Boxes (x, y, w, h) of the message bubbles in a conversation screenshot,
+    top to bottom.
+
+    The adaptive threshold picks up both the text and the edge of each
+    bubble's background, so the outer contour of a bubble encloses its
+    text. Letters and words are smeared together first, for bubbles drawn
+    without a background. Each contour is then kept only if it is shaped
+    like a bubble: neither tiny nor full width, outside the header and
+    input bar, and holding a plausible amount of ink.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    height, width = gray.shape
+    mask = text_mask(gray)
+
+    # Join letters and words; only a little vertically, so bubbles stay apart
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, width // 40), max(3, height // 200)))
+    blocks = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+
+    contours, _ = cv2.findContours(blocks, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w < width * BUBBLE_MIN_WIDTH or w > width * BUBBLE_MAX_WIDTH:
+            continue
+        if h < max(12, height * BUBBLE_MIN_HEIGHT):
+            continue
+        if y + h <= height * HEADER_HEIGHT or y >= height * (1 - INPUT_BAR_HEIGHT):
+            continue
+        ink = cv2.countNonZero(mask[y:y + h, x:x + w]) / float(w * h)
+        if not 0.01 <= ink <= 0.6:    # empty panel or solid image/photo
+            continue
+        boxes.append((x, y, w, h))
+    return _drop_nested(sorted(boxes, key=lambda b: (b[1], b[0])))
+
+
+def _drop_nested(boxes):
+    """Drop boxes that lie inside another one (a quoted reply, a link preview)."""
+    return [
+        (x, y, w, h) for x, y, w, h in boxes
+        if not any(ox <= x and oy <= y and x + w <= ox + ow and y + h <= oy + oh and (ox, oy, ow, oh) != (x, y, w, h)
+                   for ox, oy, ow, oh in boxes)
+    ]
+
+
+def _ocr_crop(img, box):
+    x, y, w, h = box
+    pad = BUBBLE_PADDING
+    crop = img[max(0, y - pad):y + h + pad, max(0, x - pad):x + w + pad]
+    return ocr_backend.image_to_string(preprocess_image(crop)).strip()
+
+
+def _bubble_pool(size):
+    with _bubble_pools_lock:
+        pool = _bubble_pools.get(size)
+        if pool is None:
+            pool = _bubble_pools[size] = ThreadPoolExecutor(max_workers=size, thread_name_prefix="Bubble-OCR")
+        return pool
+
+
+def ocr_bubbles(img, max_workers=BUBBLE_OCR_THREADS, boxes=None, progress=None, cancel=None):
+    """
+    Detect the bubbles in a screenshot (path or OpenCV image) and OCR them
+    concurrently. Returns [{"box": (x, y, w, h), "text": ...}] top to bottom,
+    without bubbles that had no readable text. With no bubbles found, the
+    whole image is OCR'd as one.
+
+    :param max_workers: size of the shared bubble thread pool; 1 OCRs on the calling thread.
+    :param boxes: bubbles already found with find_bubbles.
+    :param progress: called as progress(done, total) after each bubble, from a worker thread.
+    :param cancel: threading.Event; once set, remaining bubbles are skipped and OCRCancelled is raised.
+    """
+    if isinstance(img, str):
+        img = _read(img)
+    if boxes is None:
+        boxes = find_bubbles(img)
+    if not boxes:
+        height, width = img.shape[:2]
+        boxes = [(0, 0, width, height)]
+    texts = [""] * len(boxes)
+
+    def run(i):
+        if cancel is not None and cancel.is_set():
+            raise OCRCancelled()
+        texts[i] = _ocr_crop(img, boxes[i])
+
+    def finished(done):
+        if progress:
+            progress(done, len(boxes))
+        if cancel is not None and cancel.is_set():
+            raise OCRCancelled()
+
+    if max_workers > 1 and len(boxes) > 1:
+        # OCR engines release the GIL, so threads run the bubbles in parallel
+        futures = [_bubble_pool(max_workers).submit(run, i) for i in range(len(boxes))]
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                future.result()
+                finished(done)
+        except BaseException:
+            # Cancelled or failed: do not leave the rest queued on the shared pool
+            for future in futures:
+                future.cancel()
+            raise
+    else:
+        for i in range(len(boxes)):
+            run(i)
+            finished(i + 1)
+    return [{"box": box, "text": text} for box, text in zip(boxes, texts) if text]
+
+
+def _cached(img, mode, run_ocr):
+    if CACHE is None:
+        return run_ocr()
+    texts = CACHE.get(img, mode)
+    if texts is None:
+        texts = run_ocr()
+        CACHE.put(img, texts, mode)
+    return texts
+
+
+def ocr_bubble_texts(img, max_workers=BUBBLE_OCR_THREADS, boxes=None, progress=None, cancel=None):
+    """Texts of the bubbles in an OpenCV image, through the OCR cache (see ocr_bubbles)."""
+    return _cached(img, "bubbles", lambda: [
+        bubble["text"] for bubble in ocr_bubbles(img, max_workers, boxes, progress, cancel)
+    ])
+
+
+def _read(image_path):
+    img = cv2.imread(image_path)
+    if img is None:
+        raise ValueError(f"cannot read image: {image_path}")
+    return img
+
+
+def extract_messages_from_image(image_path):
+    """Texts of the individual SMS bubbles in a screenshot, top to bottom."""
+    try:
+        return ocr_bubble_texts(_read(image_path))
+    except Exception as e:
+        print(f"Error reading image: {e}")
+        return []
+
+
+def ocr_image(image_path):
+    """OCR one image file. Raises on unreadable images or OCR failures."""
+    img = _read(image_path)
+    texts = _cached(img, "image", lambda: [ocr_backend.image_to_string(preprocess_image(img)).strip()])
+    return texts[0] if texts else ""
 
-# Set Tesseract path for Windows
-if platform.system() == "Windows":
-    pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
 def extract_text_from_image(image_path):
     """
@@ -15,35 +230,102 @@ def extract_text_from_image(image_path):
     Preprocesses image to keep mainly SMS bubbles.
     """
     try:
-        # Load image with OpenCV
-        img = cv2.imread(image_path)
+        return ocr_image(image_path)
+    except Exception as e:
+        print(f"Error reading image: {e}")
+        return ""
 
-        if img is None:
-            return ""
 
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+# ================================================================
+#                      BATCH OCR
+# ================================================================
+def list_images(paths):
+    """Expand directories (not recursively) into their image files; files are kept as given."""
+    if isinstance(paths, str):
+        paths = [paths]
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            images.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        else:
+            images.append(path)
+    return images
 
-        # Apply adaptive threshold to highlight text
-        thresh = cv2.adaptiveThreshold(
-            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY_INV, 11, 2
-        )
 
-        # Optional: remove small noise
-        kernel = np.ones((2,2), np.uint8)
-        clean = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
+def _init_ocr_worker(backend, cache_path):
+    # One OCR per process: keep OpenCV and Tesseract from starting their own thread pools
+    cv2.setNumThreads(1)
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    # Load the engine (and its language data) before the first image arrives
+    ocr_backend.set_backend(backend)
+    ocr_backend.get_backend()
+    set_cache(cache_path)
 
-        # Invert back to normal
-        processed = cv2.bitwise_not(clean)
 
-        # Convert back to PIL Image
-        pil_img = Image.fromarray(processed)
+def _ocr_job(image_path, bubbles=False):
+    """
+    Worker side: [(path, text, error)], one entry per bubble when splitting.
+    Module-level so the pool can pickle it.
+    """
+    try:
+        if bubbles:
+            # Bubbles one after another: the pool already keeps every core busy
+            texts = ocr_bubble_texts(_read(image_path), max_workers=1)
+            return [(image_path, text, None) for text in texts] or [(image_path, "", None)]
+        return [(image_path, ocr_image(image_path), None)]
+    except Exception as e:
+        return [(image_path, "", str(e))]
 
-        # OCR
-        text = pytesseract.image_to_string(pil_img, lang='eng')
-        return text.strip()
 
-    except Exception as e:
-        print(f"Error reading image: {e}")
-        return ""
+def iter_ocr_batches(paths, max_workers=None, backend=None, bubbles=False, cache_path=None):
+    """
+    OCR images (or directories of images) on a process pool.
+
+    Yields lists of (path, text, error) in completion order; each list holds
+    everything that finished since the previous one, so a consumer can hand
+    it straight to engine.classify_batch as one micro-batch.
+
+    :param paths: image path, directory, or a list of either.
+    :param max_workers: pool size (default: number of CPUs).
+    :param backend: OCR backend for the workers (default: ocr_backend.BACKEND).
+    :param bubbles: split each screenshot into its message bubbles; an image
+                    then gives one entry per bubble.
+    :param cache_path: OCR cache file for the workers (default: that of set_cache()).
+    """
+    images = list_images(paths)
+    if not images:
+        return
+    if cache_path is None and CACHE is not None:
+        cache_path = CACHE.path
+    max_workers = min(max_workers or os.cpu_count() or 1, len(images))
+    pending = set()
+    remaining = iter(images)
+    # Spawn, not fork: callers (the app, the engine warm-up) have threads
+    # running, and a forked child can inherit one of their locks held
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_ocr_worker,
+                             initargs=(backend or ocr_backend.BACKEND, cache_path),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        try:
+            while True:
+                while len(pending) < max_workers * OCR_QUEUE_PER_WORKER:
+                    path = next(remaining, None)
+                    if path is None:
+                        break
+                    pending.add(pool.submit(_ocr_job, path, bubbles))
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield [entry for future in done for entry in future.result()]
+        finally:
+            # Consumer stopped early: drop what has not started yet
+            for future in pending:
+                future.cancel()
+
+
+def iter_ocr_results(paths, max_workers=None, backend=None, bubbles=False, cache_path=None):
+    """Like iter_ocr_batches, one (path, text, error) at a time."""
+    for batch in iter_ocr_batches(paths, max_workers, backend, bubbles, cache_path):
+        yield from batch
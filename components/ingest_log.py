@@ -0,0 +1,92 @@
+# components/ingest_log.py
+"""
+Append-only binary log of incoming messages, for reproducing real traffic
+(see tools/replay.py).
+
+File layout: the 8-byte magic b"SMSLOG1\\n", then one record per message:
+
+    >d  arrival time (Unix seconds)
+    >H  sender length in bytes
+    >I  message length in bytes
+        sender (UTF-8), message (UTF-8)
+
+A record is 14 bytes plus its text. A log cut short by a crash is read up to
+the last complete record.
+"""
+import time
+import struct
+import threading
+
+MAGIC = b"SMSLOG1\n"
+RECORD = struct.Struct(">dHI")
+FLUSH_INTERVAL = 1.0    # seconds between flushes to disk
+
+
+class IngestLogWriter:
+    """Thread-safe appender; pass as the receiver's recorder."""
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._file = open(path, "ab", buffering=1 << 16)
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self._dirty = False
+        self._closed = threading.Event()
+        self.records = 0
+        # Flush on a timer, so a quiet period after a burst still reaches the disk
+        threading.Thread(target=self._flush_loop, daemon=True, name="Ingest-Log-Flusher").start()
+
+    def record(self, message, timestamp=None):
+        """Append one message dict (or text)."""
+        if isinstance(message, dict):
+            sender, text = message.get("sender") or "", message.get("message", "")
+        else:
+            sender, text = "", str(message)
+        sender_bytes = str(sender).encode("utf-8")[:0xFFFF]
+        text_bytes = text.encode("utf-8", "surrogatepass")
+        header = RECORD.pack(time.time() if timestamp is None else timestamp, len(sender_bytes), len(text_bytes))
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(header + sender_bytes + text_bytes)
+            self.records += 1
+            self._dirty = True
+
+    def record_many(self, messages):
+        timestamp = time.time()
+        for message in messages:
+            self.record(message, timestamp)
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if self._dirty and self._file is not None:
+                    self._file.flush()
+                    self._dirty = False
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_log(path):
+    """Yield (timestamp, sender, message) for every complete record in the log."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an ingest log")
+        while True:
+            header = f.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            timestamp, sender_len, text_len = RECORD.unpack(header)
+            body = f.read(sender_len + text_len)
+            if len(body) < sender_len + text_len:
+                return  # Truncated last record
+            yield (timestamp,
+                   body[:sender_len].decode("utf-8", "replace"),
+                   body[sender_len:].decode("utf-8", "surrogatepass"))
@@ -0,0 +1,244 @@
+# components/ingest_queue.py
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+BATCH_SIZE = 256        # flush when this many messages are waiting...
+MAX_WAIT_MS = 20        # ...or when the oldest has waited this long
+MAX_DEPTH = 10000       # messages held before the overflow policy applies
+MAX_IN_FLIGHT = 2       # batches handed to the classifier and not finished yet
+SPILL_PATH = "ingest_spill.ndjson"
+
+# What put() does when the queue is full:
+#   block            refuse (return False); the receiver stops reading that
+#                    socket until there is room, so TCP flow control slows the sender
+#   drop_oldest      discard the oldest queued message to make room
+#   drop_duplicates  discard the message if the same text is already queued,
+#                    otherwise refuse it as with block
+#   spill            append the message to spill_path (one JSON line per
+#                    message, the receiver's line format) instead of queuing it
+POLICIES = ("block", "drop_oldest", "drop_duplicates", "spill")
+
+
+def _text(item):
+    return item.get("message", "") if isinstance(item, dict) else item
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+class IngestQueue:
+    """
+    Bounded queue that groups incoming messages into micro-batches for
+    engine.classify_batch. A batch is flushed when batch_size messages are
+    waiting or the oldest has waited max_wait_ms, whichever comes first.
+
+    At most max_in_flight batches are outstanding; while the classifier is
+    busy, messages keep accumulating, so batches grow under load and stay
+    small (low latency) when traffic is light. What happens once max_depth
+    messages are queued is set by policy (see POLICIES).
+    """
+
+    def __init__(self, process_batch, batch_size=BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                 max_depth=MAX_DEPTH, max_in_flight=MAX_IN_FLIGHT, history=1000,
+                 policy="block", spill_path=SPILL_PATH, on_shed=None):
+        """
+        :param process_batch: called with a list of items from the flusher thread.
+                              May return a Future (e.g. ClassificationExecutor.submit);
+                              the batch then counts as in flight until it completes.
+        :param history: per-batch metrics kept for stats().
+        :param policy: overflow policy, one of POLICIES.
+        :param spill_path: file used by the "spill" policy.
+        :param on_shed: optional on_shed(item, reason), called for every message the
+                        policy discards or spills (e.g. to answer its sender).
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.process_batch = process_batch
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_depth = max_depth
+        self.policy = policy
+        self.spill_path = spill_path
+        self.on_shed = on_shed
+
+        self._items = deque()           # (enqueued_at, item)
+        self._queued_texts = {}         # text -> count, for drop_duplicates
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(max_in_flight)
+        self._thread = None
+        self.is_running = False
+
+        self.batches = deque(maxlen=history)   # metrics of recent batches
+        self.received = 0
+        self.rejected = 0               # refused with block / drop_duplicates
+        self.shed = {"drop_oldest": 0, "drop_duplicates": 0, "spill": 0}
+        self.flushed = 0
+        self.failed = 0
+
+    # ---------- Control ----------
+    def start(self):
+        if self.is_running:
+            return
+        self.is_running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="Ingest-Flusher")
+        self._thread.start()
+
+    def stop(self, timeout=2):
+        """Flush what is queued, then stop the flusher thread."""
+        with self._cond:
+            self.is_running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    # ---------- Producer side (any thread) ----------
+    def put(self, item):
+        """
+        Queue one message. Returns False when it was refused because the queue
+        is full (the caller should retry later); shed messages return True.
+        """
+        with self._cond:
+            if len(self._items) >= self.max_depth and not self._overflow(item):
+                self.rejected += 1
+                return False
+            if len(self._items) < self.max_depth:
+                self._append(item)
+        return True
+
+    def _append(self, item):
+        self._items.append((time.monotonic(), item))
+        self.received += 1
+        if self.policy == "drop_duplicates":
+            text = _text(item)
+            self._queued_texts[text] = self._queued_texts.get(text, 0) + 1
+        # Wake the flusher to start the latency timer or flush a full batch
+        if len(self._items) == 1 or len(self._items) >= self.batch_size:
+            self._cond.notify()
+
+    def _overflow(self, item):
+        """Apply the policy to a message that found the queue full. False = refuse it."""
+        if self.policy == "drop_oldest":
+            oldest = self._items.popleft()[1]
+            self._forget(oldest)
+            self._shed(oldest, "drop_oldest")
+            return True
+        if self.policy == "drop_duplicates":
+            if _text(item) in self._queued_texts:
+                self._shed(item, "drop_duplicates")
+                return True
+            return False
+        if self.policy == "spill":
+            record = item if isinstance(item, dict) else {"message": str(item)}
+            # Only the wire fields; a reply handle cannot outlive the connection
+            record = {k: v for k, v in record.items() if k != "reply"}
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._shed(item, "spill")
+            return True
+        return False
+
+    def _shed(self, item, reason):
+        self.shed[reason] += 1
+        if self.on_shed is not None:
+            try:
+                self.on_shed(item, reason)
+            except Exception as e:
+                print(f"⚠️ WARNING: on_shed callback failed: {e}")
+
+    def _forget(self, item):
+        if self.policy == "drop_duplicates":
+            text = _text(item)
+            count = self._queued_texts.get(text, 0) - 1
+            if count > 0:
+                self._queued_texts[text] = count
+            else:
+                self._queued_texts.pop(text, None)
+
+    def __len__(self):
+        return len(self._items)
+
+    # ---------- Flusher thread ----------
+    def _run(self):
+        while True:
+            # Wait for a free slot first: messages keep queuing meanwhile
+            self._slots.acquire()
+            batch = self._next_batch()
+            if batch is None:
+                self._slots.release()
+                return
+            self._dispatch(batch)
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._items:
+                if not self.is_running:
+                    return None
+                self._cond.wait()
+            deadline = self._items[0][0] + self.max_wait
+            while self.is_running and len(self._items) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            count = min(self.batch_size, len(self._items))
+            batch = [self._items.popleft() for _ in range(count)]
+            for _, item in batch:
+                self._forget(item)
+            return batch
+
+    def _dispatch(self, batch):
+        flushed_at = time.monotonic()
+        metrics = {
+            "size": len(batch),
+            "wait_ms": (flushed_at - batch[0][0]) * 1000,
+            "processing_ms": None,
+            "error": None,
+        }
+        try:
+            result = self.process_batch([item for _, item in batch])
+        except Exception as e:
+            self._finish(metrics, flushed_at, e)
+            return
+        if isinstance(result, Future):
+            result.add_done_callback(lambda f: self._finish(metrics, flushed_at, f.exception() if not f.cancelled() else None))
+        else:
+            self._finish(metrics, flushed_at, None)
+
+    def _finish(self, metrics, flushed_at, error):
+        metrics["processing_ms"] = (time.monotonic() - flushed_at) * 1000
+        if error is not None:
+            metrics["error"] = str(error)
+            self.failed += 1
+        self.flushed += metrics["size"]
+        self.batches.append(metrics)
+        self._slots.release()
+
+    # ---------- Metrics ----------
+    def stats(self):
+        """Queue counters plus size / wait / processing figures over recent batches."""
+        batches = list(self.batches)
+        waits = sorted(b["wait_ms"] for b in batches)
+        processing = sorted(b["processing_ms"] for b in batches)
+        return {
+            "depth": len(self._items),
+            "max_depth": self.max_depth,
+            "received": self.received,
+            "policy": self.policy,
+            "rejected": self.rejected,
+            "shed": dict(self.shed),
+            "flushed": self.flushed,
+            "failed_batches": self.failed,
+            "batches": len(batches),
+            "mean_batch_size": sum(b["size"] for b in batches) / len(batches) if batches else 0.0,
+            "wait_ms_p50": _percentile(waits, 0.5),
+            "wait_ms_p99": _percentile(waits, 0.99),
+            "processing_ms_p50": _percentile(processing, 0.5),
+            "processing_ms_p99": _percentile(processing, 0.99),
+        }
@@ -8,9 +8,12 @@ class IntroScreen:
     def __init__(self, master, duration=3000):
         """
         A modern, theme-adaptive splash screen for SMS Detector.
+        :param duration: longest time (ms) the splash stays up; finish() ends it sooner.
         """
         self.master = master
         self.duration = duration
+        self._finished = False      # finish() called: leave right after the fade-in
+        self._fading_out = False
 
         # === Splash window ===
         self.root = ctk.CTkToplevel(master)
@@ -126,8 +129,23 @@ class IntroScreen:
             self.alpha += 0.03
             self.root.attributes("-alpha", self.alpha)
             self.root.after(20, self._fade_in)
+        elif self._finished:
+            self._start_fade_out()
         else:
-            self.root.after(self.duration, self._fade_out)
+            self.root.after(self.duration, self._start_fade_out)
+
+    def finish(self):
+        """The app is ready: fade out as soon as the splash has faded in."""
+        self._finished = True
+        self.progress.set(1)
+        self.progress_value = 100
+        if self.alpha >= 1.0:
+            self._start_fade_out()
+
+    def _start_fade_out(self):
+        if not self._fading_out:
+            self._fading_out = True
+            self._fade_out()
 
     def _fade_out(self):
         if self.alpha > 0.0:
@@ -1,59 +1,184 @@
+import os
+import asyncio
 import threading
 import socket
-import sys
 import time
 import traceback
-import random
+import itertools
+from collections import deque
+
+from components.framing import FrameDecoder, FrameError, encode_line, decode_datagram
 
 # --- TCP Configuration ---
 # Use an empty string for the hostname to listen on all available interfaces (0.0.0.0)
-HOST = '' 
+HOST = ''
 PORT = 65432       # Port to listen on (non-privileged ports are > 1023)
-BUFFER_SIZE = 1024 # Size of buffer for receiving data
+BUFFER_SIZE = 65536 # Max bytes taken from the socket per read
+BACKLOG = 1024     # Pending connections the OS queues for accept()
+IDLE_TIMEOUT = 300 # Seconds a client may stay silent before it is disconnected
+LEGACY_FLUSH_DELAY = 0.5  # Seconds after which unterminated text counts as one message
+PAUSE_INTERVAL = 0.01     # Seconds between retries while the consumer refuses messages
+LATENCY_HISTORY = 10000   # Request latencies kept for stats()
+UDP_RCVBUF = 4 << 20      # Requested kernel receive buffer for the UDP socket (bytes)
+
+
+class Connection:
+    """Per-client state, owned by the receiver's event loop."""
+
+    def __init__(self, conn_id, address, writer):
+        self.id = conn_id
+        self.address = address
+        self.writer = writer
+        self.decoder = FrameDecoder()
+        self.deferred = deque()     # decoded messages the consumer has not accepted yet
+        self.outstanding = 0        # requests still waiting for their response
+        self.connected_at = self.last_seen = time.time()
+        self.messages = 0
+        self.bytes_received = 0
+
+    @property
+    def host(self):
+        if isinstance(self.address, tuple):
+            return self.address[0]
+        return "local"  # Unix domain socket peers have no address
+
+
+class Reply:
+    """
+    Attached as message["reply"] to frames that carry an "id". Calling it
+    (from any thread) writes {"id": ..., **payload} back to the client as a
+    JSON line. Only the first call sends anything.
+    """
+
+    __slots__ = ("receiver", "conn", "request_id", "received_at", "sent")
+
+    def __init__(self, receiver, conn, request_id):
+        self.receiver = receiver
+        self.conn = conn
+        self.request_id = request_id
+        self.received_at = time.monotonic()
+        self.sent = False
+        conn.outstanding += 1
+
+    def __call__(self, payload):
+        if self.sent:
+            return
+        self.sent = True
+        self.receiver._respond(self.conn, {"id": self.request_id, **payload}, self.received_at)
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, receiver):
+        self.receiver = receiver
+
+    def datagram_received(self, data, addr):
+        self.receiver._on_datagram(data, addr)
+
 
 class NetworkSMSReceiver:
     """
-    Manages TCP server creation, client connection, and synchronous data 
-    reception in a dedicated thread.
+    Manages an asyncio TCP server in a dedicated thread. Every client gets its
+    own coroutine on one event loop, so many phones and gateways can stay
+    connected at the same time.
+
+    The same loop can also serve a Unix domain socket (stream, same framing,
+    same replies) for gateways on this host, and a UDP port for
+    fire-and-forget feeds: each datagram holds whole frames, nothing is sent
+    back and messages that arrive while the consumer is full are dropped.
     """
 
-    def __init__(self, root_instance, sms_callback, log_callback):
+    def __init__(self, root_instance, sms_callback, log_callback, idle_timeout=IDLE_TIMEOUT,
+                 unix_path=None, udp_port=None, tcp=True, dispatcher=None, recorder=None):
         """
-        :param root_instance: Tk root (used for root.after safe callbacks).
-        :param sms_callback: function to call on received SMS: sms_callback(message_str).
+        :param root_instance: Tk root (used for root.after safe callbacks), or None when
+                              running headless: callbacks are then called directly.
+        :param sms_callback: function to call on received SMS: sms_callback(message_dict),
+                             with "message" and optionally "sender" (see components.framing).
+                             Called from the receiver thread, so it must be thread-safe.
+                             Returning False means "full, try again later": the message
+                             is kept and the connection stops reading until it is accepted.
+                             Frames with an "id" also get message["reply"], a Reply to
+                             call with the response payload once the verdict is known.
         :param log_callback: function to call for log messages: log_callback(text, label).
+        :param idle_timeout: seconds of silence before a client is disconnected (None = never).
+        :param unix_path: also listen on this Unix domain socket path (POSIX only).
+        :param udp_port: also accept UDP datagrams on this port.
+        :param tcp: set False to serve only the Unix socket and/or UDP.
+        :param dispatcher: optional UIDispatcher; log lines and status updates then
+                           go through its tick instead of one root.after call each,
+                           and only the newest status is shown.
+        :param recorder: optional IngestLogWriter; every decoded frame is appended to it
+                         as it arrives, before any queueing or shedding.
         """
         self.root = root_instance
         self.sms_callback = sms_callback
         self.log_callback = log_callback
+        self.idle_timeout = idle_timeout
+        self.unix_path = unix_path
+        self.udp_port = udp_port
+        self.tcp = tcp
+        self.dispatcher = dispatcher
+        self.recorder = recorder
 
-        self.server_socket = None
-        self.client_socket = None
-        self.conn_address = None
+        self.loop = None
+        self.server = None
+        self.unix_server = None
+        self.udp_transport = None
+        self.tcp_port = None        # port actually bound (differs from the requested one for port 0)
         self.thread = None
-        
+        self.connections = {}       # id -> Connection
+        self._tasks = set()         # one handler task per connection
+        self._ids = itertools.count(1)
+        self._stopped = None        # asyncio.Event, set by stop_server
+        self.deferred = 0           # messages that had to wait for the consumer
+        self.pauses = 0             # times a connection stopped reading for that
+        self.requests = 0           # frames that carried an id
+        self.responses = 0
+        self.dropped_responses = 0  # client gone before its verdict was ready
+        self.latencies = deque(maxlen=LATENCY_HISTORY)  # request -> response, seconds
+        self.datagrams = 0
+        self.udp_dropped = 0        # UDP messages refused by the consumer or malformed
+
         self.is_running = False
+        self.listening = threading.Event()  # set once the listeners are open (or failed to open)
         self.ui_callback = None # UI callback to update the connection status/IP
 
     # ---------- UI callback setters ----------
     def set_ui_update_callback(self, callback):
         """Sets the function from the UI window used to update the status."""
         self.ui_callback = callback
-        
+
     def _update_ui_status_safe(self, status):
         """Sends connection status back to the UI thread."""
-        if self.ui_callback:
+        if not self.ui_callback:
+            return
+        if self.dispatcher is not None:
+            # Superseded statuses are never drawn
+            self.dispatcher.call_latest("network_status", self.ui_callback, status)
+        else:
             # Safely execute the UI update callback in the main thread
-            self.root.after(0, self.ui_callback, status)
+            self._call_safe(self.ui_callback, status)
+
+    def _log_safe(self, text, label="Info"):
+        self._call_safe(self.log_callback, text, label)
+
+    def _call_safe(self, fn, *args):
+        if self.dispatcher is not None:
+            self.dispatcher.call(fn, *args)
+        elif self.root is None:
+            fn(*args)
+        else:
+            self.root.after(0, fn, *args)
 
     # ---------- Server Control ----------
     def start_server(self, port=PORT):
-        """Starts the main server thread."""
+        """Starts the server thread and its event loop."""
         if self.is_running:
-            self.log_callback("Server already running.", "Info")
+            self._log_safe("Server already running.", "Info")
             return
 
         self.is_running = True
+        self.listening.clear()
         self.thread = threading.Thread(target=self._run_server_thread, args=(port,), daemon=True, name="TCP-Server-Thread")
         self.thread.start()
 
@@ -63,107 +188,287 @@ class NetworkSMSReceiver:
             return
 
         self.is_running = False
-        
-        # Close client connection first
-        if self.client_socket:
-            try:
-                self.client_socket.close()
-            except Exception:
-                pass
-            self.client_socket = None
-            self.conn_address = None
-            
-        # Close the server listening socket
-        if self.server_socket:
+
+        # Wake the event loop; it closes the listener and every client itself
+        if self.loop and self._stopped:
             try:
-                # Unblock socket.accept() by connecting a temporary socket to itself
-                temp_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                temp_sock.connect(('127.0.0.1', self.server_socket.getsockname()[1]))
-                temp_sock.close()
-                self.server_socket.close()
-            except Exception:
-                pass
-            self.server_socket = None
+                self.loop.call_soon_threadsafe(self._stopped.set)
+            except RuntimeError:
+                pass  # Loop already closed
 
         if self.thread and self.thread.is_alive():
-            self.thread.join(timeout=1)
-            
+            self.thread.join(timeout=2)
+
         self.thread = None
-        self.log_callback("Network server stopped.", "Info")
+        self._log_safe("Network server stopped.", "Info")
         self._update_ui_status_safe("Stopped")
 
+    def stats(self):
+        """Snapshot of the connected clients."""
+        conns = list(self.connections.values())
+        return {
+            "connections": len(conns),
+            "paused_connections": sum(1 for c in conns if c.deferred),
+            "deferred": self.deferred,
+            "pauses": self.pauses,
+            "messages": sum(c.messages for c in conns),
+            "bytes_received": sum(c.bytes_received for c in conns),
+            "requests": self.requests,
+            "responses": self.responses,
+            "dropped_responses": self.dropped_responses,
+            "datagrams": self.datagrams,
+            "udp_dropped": self.udp_dropped,
+            **self.latency_stats(),
+        }
+
+    def latency_stats(self):
+        """Request latency percentiles (ms) over the last LATENCY_HISTORY responses."""
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {"latency_ms_p50": 0.0, "latency_ms_p95": 0.0, "latency_ms_p99": 0.0}
+        pick = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+        return {"latency_ms_p50": pick(0.5), "latency_ms_p95": pick(0.95), "latency_ms_p99": pick(0.99)}
 
     # ---------- Background Server Thread ----------
     def _run_server_thread(self, port):
-        """The main execution loop for the TCP server thread."""
+        """Owns the event loop for the lifetime of the server."""
         try:
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            # Allows the server to reuse the same port immediately after shutdown
-            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) 
-            
-            self.server_socket.bind((HOST, port))
-            self.server_socket.listen(1) # Allow only one simultaneous connection (the phone app)
-            
-            # Determine actual IP and port used for display
-            host_ip = socket.gethostbyname(socket.gethostname())
-            server_port = self.server_socket.getsockname()[1]
-            
-            self.log_callback(f"Server started on {host_ip}:{server_port}. Waiting for connection...", "Info")
-            self._update_ui_status_safe(f"Listening on {host_ip}:{server_port}")
-            
-            while self.is_running:
-                self.client_socket, self.conn_address = self.server_socket.accept() # Blocking call
-                
-                if not self.is_running: break # Check if stop was called while waiting for accept
-                
-                self._update_ui_status_safe(f"Connected to {self.conn_address[0]}")
-                
-                # Start data reception loop
-                self._receive_data_loop()
-                
+            asyncio.run(self._serve(port))
         except Exception as e:
             if self.is_running: # Only log error if not explicitly shutting down
                 tb = traceback.format_exc()
-                self.root.after(0, self.log_callback, f"Server thread error: {e}\n{tb}", "Error")
-            
+                self._log_safe(f"Server thread error: {e}\n{tb}", "Error")
         finally:
             self.is_running = False
-            self.client_socket = None
-            self.conn_address = None
+            self.loop = None
+            self.listening.set()
             self._update_ui_status_safe("Stopped")
-            
-    # ---------- Data Reception Loop ----------
-    def _receive_data_loop(self):
-        """Handles continuous data reception from the connected client."""
-        while self.is_running and self.client_socket:
+
+    async def _serve(self, port):
+        self.loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        if not self.is_running:
+            return  # stop_server ran before the loop existed
+
+        listening = []
+        if self.tcp:
+            # HOST '' listens on IPv6 and IPv4; for port 0 each socket would get its
+            # own random port, so bind IPv4 only and there is one port to report
+            host = HOST or (None if port else "0.0.0.0")
+            self.server = await asyncio.start_server(
+                self._handle_client, host, port,
+                reuse_address=True, backlog=BACKLOG,
+            )
+            # Determine actual IP and port used for display
             try:
-                data = self.client_socket.recv(BUFFER_SIZE)
-                if not data:
-                    # Client disconnected gracefully
-                    self.log_callback(f"Client {self.conn_address[0]} disconnected.", "Info")
-                    break
-                
-                # Decode the received data
-                message = data.decode('utf-8').strip()
-                
-                # --- Simulating SMS Data Transfer ---
-                # Since the phone app sends a string, we treat it as the SMS content.
-                if message:
-                    self.root.after(0, self.log_callback, f"Received {len(message)} chars from client.", "Info")
-                    # Send the received message to the main application for prediction
-                    self.root.after(0, self.sms_callback, message)
-                    
-            except ConnectionResetError:
-                self.log_callback(f"Client {self.conn_address[0]} forcibly closed connection.", "Error")
-                break
-            except Exception as e:
-                self.log_callback(f"Data reception error: {e}", "Error")
-                break
-
-        # Clean up client socket state after exit
-        if self.client_socket:
-            try: self.client_socket.close()
-            except Exception: pass
-        self.client_socket = None
-        self.conn_address = None
-        self._update_ui_status_safe("Listening") # Go back to listening if server is still running
+                host_ip = socket.gethostbyname(socket.gethostname())
+            except OSError:
+                host_ip = "0.0.0.0"
+            self.tcp_port = self.server.sockets[0].getsockname()[1]
+            listening.append(f"{host_ip}:{self.tcp_port}")
+
+        if self.unix_path:
+            if hasattr(socket, "AF_UNIX") and hasattr(asyncio, "start_unix_server"):
+                self._remove_unix_socket()  # Stale file from an unclean exit
+                self.unix_server = await asyncio.start_unix_server(
+                    self._handle_client, self.unix_path, backlog=BACKLOG,
+                )
+                listening.append(f"unix:{self.unix_path}")
+            else:
+                self._log_safe("⚠️ WARNING: Unix domain sockets are not supported on this platform.", "Error")
+
+        if self.udp_port:
+            self.udp_transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: _DatagramProtocol(self), local_addr=(HOST or "0.0.0.0", self.udp_port),
+            )
+            try:
+                # A larger kernel buffer absorbs bursts that would otherwise be dropped
+                udp_sock = self.udp_transport.get_extra_info("socket")
+                udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RCVBUF)
+            except (OSError, AttributeError):
+                pass
+            self.udp_port = self.udp_transport.get_extra_info("sockname")[1]
+            listening.append(f"udp:{self.udp_port}")
+
+        self.listening.set()
+        where = ", ".join(listening) or "nothing"
+        self._log_safe(f"Server started on {where}. Waiting for connections...", "Info")
+        self._update_ui_status_safe(f"Listening on {where}")
+
+        try:
+            await self._stopped.wait()
+        finally:
+            # Stop accepting, then close every client and wait for its handler
+            servers = [srv for srv in (self.server, self.unix_server) if srv is not None]
+            for srv in servers:
+                srv.close()
+            if self.udp_transport is not None:
+                self.udp_transport.close()
+            for task in list(self._tasks):
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            for srv in servers:
+                await srv.wait_closed()
+            if self.unix_server is not None:
+                self._remove_unix_socket()
+            self.server = self.unix_server = self.udp_transport = None
+
+    def _remove_unix_socket(self):
+        try:
+            os.unlink(self.unix_path)
+        except FileNotFoundError:
+            pass
+
+    # ---------- Datagrams ----------
+    def _on_datagram(self, data, addr):
+        self.datagrams += 1
+        try:
+            messages = decode_datagram(data)
+        except FrameError as e:
+            self.udp_dropped += 1
+            self._log_safe(f"Invalid datagram from {addr[0]}: {e}", "Error")
+            return
+        if self.recorder is not None:
+            self.recorder.record_many(messages)
+        for message in messages:
+            message.pop("reply", None)  # Nothing is sent back over UDP
+            if message["message"] and self.sms_callback(message) is False:
+                self.udp_dropped += 1
+
+    # ---------- Per-Connection Handler ----------
+    async def _handle_client(self, reader, writer):
+        conn = Connection(next(self._ids), writer.get_extra_info("peername"), writer)
+        self.connections[conn.id] = conn
+        task = asyncio.current_task()
+        self._tasks.add(task)
+
+        self._update_ui_status_safe(f"Connected to {conn.host} ({len(self.connections)} clients)")
+
+        try:
+            await self._receive_data_loop(conn, reader)
+        except asyncio.CancelledError:
+            pass  # Server shutting down
+        except FrameError as e:
+            self._log_safe(f"Client {conn.host} sent an invalid frame: {e}", "Error")
+        except ConnectionResetError:
+            self._log_safe(f"Client {conn.host} forcibly closed connection.", "Error")
+        except Exception as e:
+            self._log_safe(f"Data reception error: {e}", "Error")
+        finally:
+            # Clean up client state after exit
+            self.connections.pop(conn.id, None)
+            self._tasks.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+            if self.is_running:
+                self._update_ui_status_safe(f"Listening ({len(self.connections)} clients)")
+
+    async def _receive_data_loop(self, conn, reader):
+        """Handles continuous data reception from one client."""
+        decoder = conn.decoder
+        while self.is_running:
+            # Backpressure: while the consumer refuses messages, stop reading.
+            # The socket buffer fills and TCP flow control slows the sender.
+            if conn.deferred:
+                await self._drain_deferred(conn)
+                continue
+
+            # Older phone apps send bare text without a newline: if such text
+            # is waiting, only wait briefly before taking it as a message.
+            # A partial JSON line or binary frame waits for its remaining bytes
+            # (up to idle_timeout), and so does anything from a client that
+            # has already sent a framed message.
+            legacy_wait = decoder.legacy_pending and LEGACY_FLUSH_DELAY
+            timeout = legacy_wait or self.idle_timeout
+            try:
+                data = await asyncio.wait_for(reader.read(BUFFER_SIZE), timeout)
+            except asyncio.TimeoutError:
+                if legacy_wait:
+                    self._deliver(conn, self._accept(conn, decoder.flush()))
+                    continue
+                # Take what the client left unterminated (a final line without
+                # its newline) as a message; only a cut-off binary frame is lost
+                self._deliver(conn, self._accept(conn, decoder.flush()))
+                if decoder.pending:
+                    self._log_safe(f"Client {conn.host} left an incomplete frame ({decoder.pending} bytes), "
+                                   f"dropped.", "Error")
+                await self._drain_deferred(conn)
+                await self._wait_for_responses(conn)
+                self._log_safe(f"Client {conn.host} idle for {self.idle_timeout}s, disconnected.", "Info")
+                return
+            if not data:
+                # Client disconnected gracefully (or only closed its sending side):
+                # hand over what it already sent and answer outstanding requests
+                self._deliver(conn, self._accept(conn, decoder.flush()))
+                await self._drain_deferred(conn)
+                await self._wait_for_responses(conn)
+                self._log_safe(f"Client {conn.host} disconnected.", "Info")
+                return
+
+            conn.last_seen = time.time()
+            conn.bytes_received += len(data)
+            self._deliver(conn, self._accept(conn, decoder.feed(data)))
+            # Stop reading while the client is not reading its responses
+            await conn.writer.drain()
+
+    def _accept(self, conn, messages):
+        """Record freshly decoded frames and give requests their reply handle."""
+        if self.recorder is not None and messages:
+            self.recorder.record_many(messages)
+        for message in messages:
+            message.pop("reply", None)  # Reserved for the Reply handle
+            if "id" in message:
+                message["reply"] = Reply(self, conn, message["id"])
+                self.requests += 1
+        return messages
+
+    def _deliver(self, conn, messages):
+        """Pass messages to sms_callback in order; keep the rest once it refuses one."""
+        deferred = conn.deferred
+        deferred.extend(messages)
+        while deferred:
+            message = deferred[0]
+            if not message["message"]:
+                if "reply" in message:
+                    message["reply"]({"error": "empty message"})
+            elif self.sms_callback(message) is False:
+                # Messages from this call still waiting (older ones were counted before)
+                self.deferred += min(len(deferred), len(messages))
+                return
+            else:
+                conn.messages += 1
+            deferred.popleft()
+
+    async def _drain_deferred(self, conn):
+        if conn.deferred:
+            self.pauses += 1
+        while conn.deferred and self.is_running:
+            await asyncio.sleep(PAUSE_INTERVAL)
+            self._deliver(conn, ())
+
+    async def _wait_for_responses(self, conn):
+        deadline = time.monotonic() + (self.idle_timeout or IDLE_TIMEOUT)
+        while conn.outstanding and self.is_running and time.monotonic() < deadline:
+            await asyncio.sleep(PAUSE_INTERVAL)
+        await conn.writer.drain()
+
+    # ---------- Responses ----------
+    def _respond(self, conn, payload, received_at):
+        """Thread-safe: queue one response frame for conn."""
+        data = encode_line(payload)
+        try:
+            self.loop.call_soon_threadsafe(self._write, conn, data, received_at)
+        except (AttributeError, RuntimeError):
+            self.dropped_responses += 1  # Server stopped
+
+    def _write(self, conn, data, received_at):
+        conn.outstanding -= 1
+        if conn.id not in self.connections or conn.writer.is_closing():
+            self.dropped_responses += 1
+            return
+        conn.writer.write(data)
+        self.responses += 1
+        self.latencies.append(time.monotonic() - received_at)
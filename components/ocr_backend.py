@@ -0,0 +1,131 @@
+# components/ocr_backend.py
+"""
+OCR engine used by image_to_text and SMSCropper.
+
+pytesseract writes each image to a temp file and starts a new `tesseract`
+process, which reloads the language data every time. When the tesserocr
+binding (Tesseract's C API) is installed, one engine is created per thread
+and kept warm instead; otherwise pytesseract is used as before.
+
+    ocr_backend.image_to_string(pil_image_or_array)
+    ocr_backend.set_backend("pytesseract")      # "auto" (default), "tesserocr", "pytesseract"
+"""
+import os
+import time
+import platform
+import threading
+
+BACKENDS = ("auto", "tesserocr", "pytesseract")
+LANG = "eng"
+
+# Windows installer locations
+if platform.system() == "Windows":
+    TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+    TESSDATA_PATH = r"C:\Program Files\Tesseract-OCR\tessdata"
+else:
+    TESSERACT_CMD = None
+    TESSDATA_PATH = os.environ.get("TESSDATA_PREFIX")
+
+BACKEND = "auto"
+_local = threading.local()      # per-thread engine: a Tesseract API object is not thread-safe
+
+
+def _to_pil(image):
+    """PIL images pass through; OpenCV arrays (gray or BGR) are converted."""
+    from PIL import Image
+    if isinstance(image, Image.Image):
+        return image
+    if image.ndim == 3:
+        import cv2
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    return Image.fromarray(image)
+
+
+class TesserocrBackend:
+    """Long-lived in-process engine; language data is loaded once."""
+    name = "tesserocr"
+
+    def __init__(self, lang=LANG):
+        import tesserocr
+        kwargs = {"lang": lang}
+        if TESSDATA_PATH:
+            kwargs["path"] = TESSDATA_PATH
+        self.api = tesserocr.PyTessBaseAPI(**kwargs)
+        self.calls = 0
+        self.seconds = 0.0
+
+    def image_to_string(self, image):
+        start = time.perf_counter()
+        try:
+            self.api.SetImage(_to_pil(image))
+            return self.api.GetUTF8Text()
+        finally:
+            self.api.Clear()
+            self.calls += 1
+            self.seconds += time.perf_counter() - start
+
+    def close(self):
+        self.api.End()
+
+
+class PytesseractBackend:
+    """Fallback: one `tesseract` process per image."""
+    name = "pytesseract"
+
+    def __init__(self, lang=LANG):
+        import pytesseract
+        if TESSERACT_CMD:
+            pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+        self.pytesseract = pytesseract
+        self.lang = lang
+        self.calls = 0
+        self.seconds = 0.0
+
+    def image_to_string(self, image):
+        start = time.perf_counter()
+        try:
+            return self.pytesseract.image_to_string(_to_pil(image), lang=self.lang)
+        finally:
+            self.calls += 1
+            self.seconds += time.perf_counter() - start
+
+    def close(self):
+        pass
+
+
+def set_backend(name):
+    """Choose the engine for threads that have not created one yet."""
+    global BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend: {name}")
+    BACKEND = name
+
+
+def _create(name):
+    if name in ("auto", "tesserocr"):
+        try:
+            return TesserocrBackend()
+        except ImportError:
+            if name == "tesserocr":
+                raise
+        except RuntimeError as e:
+            # tesserocr present but cannot load the language data
+            if name == "tesserocr":
+                raise
+            print(f"⚠️ WARNING: tesserocr unavailable ({e}); using pytesseract.")
+    return PytesseractBackend()
+
+
+def get_backend():
+    """This thread's OCR engine, created on first use."""
+    backend = getattr(_local, "backend", None)
+    if backend is None or (BACKEND != "auto" and backend.name != BACKEND):
+        if backend is not None:
+            backend.close()
+        backend = _local.backend = _create(BACKEND)
+    return backend
+
+
+def image_to_string(image):
+    """OCR a PIL image or OpenCV array with this thread's engine."""
+    return get_backend().image_to_string(image)
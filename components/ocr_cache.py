@@ -0,0 +1,241 @@
+# components/ocr_cache.py
+import json
+import time
+import sqlite3
+import threading
+
+import cv2
+import numpy as np
+
+HASH_SIZE = 16          # 16x16 difference hash = 256 bits
+MAX_DISTANCE = 12       # differing bits for a candidate; the thumbnail check decides
+MAX_ASPECT_DRIFT = 0.03 # resizing keeps the aspect ratio; a different crop does not
+MAX_CANDIDATES = 3      # nearest hashes checked against their thumbnail per lookup
+
+# The hash only sees the layout: two screenshots of one app with different
+# text can be a few bits apart. A hit must also match a thumbnail in which
+# small text is still legible.
+THUMB_WIDTH = 256       # ~20 KB per entry as PNG
+THUMB_TOLERANCE = 24    # grey levels a pixel may drift through re-encoding/resizing
+THUMB_MAX_PIXELS = 4    # pixels past the tolerance still counted as the same text
+
+
+def dhash(img, size=HASH_SIZE):
+    """
+    Difference hash of an OpenCV image: shrink the grayscale image to
+    (size + 1) x size and record whether each pixel is brighter than its
+    right neighbour. Survives re-encoding, resizing and small colour shifts.
+    Returns size * size / 8 bytes.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1]).tobytes()
+
+
+def thumbnail(img, shape=None):
+    """
+    Slightly blurred grayscale copy of an OpenCV image, THUMB_WIDTH wide, or
+    resized to exactly shape (height, width) to compare with a stored one.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    if shape is None:
+        shape = (max(1, round(gray.shape[0] * THUMB_WIDTH / gray.shape[1])), THUMB_WIDTH)
+    small = cv2.resize(gray, (shape[1], shape[0]), interpolation=cv2.INTER_AREA)
+    return cv2.GaussianBlur(small, (3, 3), 0)
+
+
+def same_text(stored, img):
+    """Whether img matches a stored thumbnail closely enough to share its OCR."""
+    changed = cv2.absdiff(stored, thumbnail(img, stored.shape)) > THUMB_TOLERANCE
+    return int(np.count_nonzero(changed)) <= THUMB_MAX_PIXELS
+
+
+class OCRCache:
+    """
+    OCR results of earlier screenshots, found by perceptual hash, so a scam
+    screenshot forwarded again (re-encoded, resized) is not OCR'd twice.
+
+    The hash finds candidates; each is confirmed against a stored thumbnail
+    before its texts are returned, so a screenshot that only shares the
+    layout is OCR'd rather than given another message's text.
+
+    Stored in SQLite so it outlives the app and is shared by the batch OCR
+    worker processes; each connection keeps the hashes in a NumPy array and
+    compares them all at once. Bounded to max_entries, evicting the least
+    recently used. Lookup counters are kept in the database too, so the hit
+    rate covers every process.
+    """
+
+    def __init__(self, path, max_entries=5000, max_distance=MAX_DISTANCE):
+        """
+        :param path: SQLite file (":memory:" for a private cache).
+        :param max_entries: entries kept before the least recently used are evicted
+                            (~20 KB each on disk, for the thumbnail).
+        :param max_distance: largest Hamming distance for a candidate match.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(ocr)")]
+        if columns and "thumb" not in columns:
+            # Cache file from before thumbnails: its hits cannot be confirmed
+            self._db.execute("DROP TABLE ocr")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS ocr (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,   -- never reused: mirrors track the last id seen
+                hash BLOB NOT NULL,
+                aspect REAL NOT NULL,
+                mode TEXT NOT NULL,
+                texts TEXT NOT NULL,
+                thumb BLOB NOT NULL,                    -- PNG, see thumbnail()
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ocr_last_used ON ocr(last_used);
+            CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        """)
+        self._db.commit()
+
+        # In-memory mirror of (id, hash, aspect, mode), refreshed from new rows
+        self._ids = np.zeros(0, np.int64)
+        self._hashes = np.zeros((0, HASH_SIZE * HASH_SIZE // 8), np.uint8)
+        self._aspects = np.zeros(0, np.float64)
+        self._modes = []
+        self._seen_id = 0
+        self._reload()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ---------- Mirror ----------
+    def _reload(self):
+        self._ids = self._ids[:0]
+        self._hashes = self._hashes[:0]
+        self._aspects = self._aspects[:0]
+        self._modes = []
+        self._seen_id = 0
+        self._refresh()
+
+    def _refresh(self):
+        """Pick up rows added since the last look, by this or another process."""
+        rows = self._db.execute(
+            "SELECT id, hash, aspect, mode FROM ocr WHERE id > ? ORDER BY id", (self._seen_id,)
+        ).fetchall()
+        if not rows:
+            return
+        self._ids = np.concatenate([self._ids, np.array([r[0] for r in rows], np.int64)])
+        self._hashes = np.concatenate([self._hashes, np.frombuffer(b"".join(r[1] for r in rows), np.uint8)
+                                       .reshape(len(rows), -1)])
+        self._aspects = np.concatenate([self._aspects, np.array([r[2] for r in rows], np.float64)])
+        self._modes.extend(r[3] for r in rows)
+        self._seen_id = rows[-1][0]
+
+    # ---------- Lookup / store ----------
+    def get(self, img, mode="image"):
+        """
+        Earlier OCR texts (a list) for this image, or None.
+
+        :param img: OpenCV image.
+        :param mode: "image" (whole-image OCR) or "bubbles"; they are cached apart.
+        """
+        key = dhash(img)
+        aspect = img.shape[1] / float(img.shape[0])
+        with self._lock:
+            self._refresh()
+            texts = None
+            evicted = False
+            for row_id in self._nearest(key, aspect, mode):
+                row = self._db.execute("SELECT texts, thumb FROM ocr WHERE id = ?", (row_id,)).fetchone()
+                if row is None:
+                    evicted = True      # by another process
+                    continue
+                stored = cv2.imdecode(np.frombuffer(row[1], np.uint8), cv2.IMREAD_GRAYSCALE)
+                if same_text(stored, img):
+                    texts = json.loads(row[0])
+                    self._db.execute("UPDATE ocr SET last_used = ? WHERE id = ?", (time.time(), row_id))
+                    break
+            if evicted:
+                self._reload()
+            if texts is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            self._count("hits" if texts is not None else "misses")
+            self._db.commit()
+            return texts
+
+    def _nearest(self, key, aspect, mode):
+        """Ids of the closest candidate entries, nearest first."""
+        if not len(self._ids):
+            return []
+        distances = np.unpackbits(self._hashes ^ np.frombuffer(key, np.uint8), axis=1).sum(axis=1)
+        candidates = (distances <= self.max_distance) & (np.abs(self._aspects - aspect) <= aspect * MAX_ASPECT_DRIFT)
+        candidates &= np.array([m == mode for m in self._modes], bool)
+        found = np.flatnonzero(candidates)
+        found = found[np.argsort(distances[found], kind="stable")][:MAX_CANDIDATES]
+        return [int(self._ids[i]) for i in found]
+
+    def put(self, img, texts, mode="image"):
+        """Remember the OCR texts (a list) of an image."""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO ocr (hash, aspect, mode, texts, thumb, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (dhash(img), img.shape[1] / float(img.shape[0]), mode,
+                 json.dumps(list(texts), ensure_ascii=False),
+                 cv2.imencode(".png", thumbnail(img))[1].tobytes(), time.time()),
+            )
+            self._evict()
+            self._db.commit()
+            self._refresh()
+
+    def _evict(self):
+        count = self._db.execute("SELECT COUNT(*) FROM ocr").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        # Evict a tenth of the cache at once so inserts do not evict one row each time
+        excess = max(excess, self.max_entries // 10)
+        self._db.execute(
+            "DELETE FROM ocr WHERE id IN (SELECT id FROM ocr ORDER BY last_used LIMIT ?)", (excess,)
+        )
+        self._count("evictions", excess)
+        self.evictions += excess
+        self._reload()
+
+    def _count(self, name, n=1):
+        self._db.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, n)
+        )
+
+    # ---------- Monitoring ----------
+    def __len__(self):
+        return len(self._ids)
+
+    def stats(self):
+        """Counters of this process and totals for the whole cache file."""
+        with self._lock:
+            totals = dict(self._db.execute("SELECT name, value FROM counters").fetchall())
+            size = self._db.execute("SELECT COUNT(*) FROM ocr").fetchone()[0]
+        lookups = self.hits + self.misses
+        total_lookups = totals.get("hits", 0) + totals.get("misses", 0)
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "total_hits": totals.get("hits", 0),
+            "total_misses": totals.get("misses", 0),
+            "total_evictions": totals.get("evictions", 0),
+            "total_hit_rate": totals.get("hits", 0) / total_lookups if total_lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
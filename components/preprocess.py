@@ -1,85 +1,310 @@
 import re
+import gzip
+import json
 import string
+import threading
 import unicodedata
-import spacy
-from nltk.corpus import stopwords 
+
+# NLTK and spaCy are imported on first use (or by engine.warm_up on a
+# background thread): importing them alone takes seconds.
 
 # --- GEREKLİ NLTK KAYNAKLARI ---
-try:
-    english_stopwords = set(stopwords.words('english'))
-except LookupError:
-    import nltk
-    nltk.download('stopwords')
-    english_stopwords = set(stopwords.words('english'))
+english_stopwords = None
+_stopwords_lock = threading.Lock()
+
+
+def get_stopwords():
+    global english_stopwords
+    if english_stopwords is None:
+        with _stopwords_lock:
+            if english_stopwords is None:
+                from nltk.corpus import stopwords
+                try:
+                    words = set(stopwords.words('english'))
+                except LookupError:
+                    import nltk
+                    nltk.download('stopwords')
+                    words = set(stopwords.words('english'))
+                english_stopwords = words
+    return english_stopwords
+
 
 # --- spaCy Modelini Yükleme ---
-try:
-    nlp = spacy.load("en_core_web_sm", disable=["parser", "ner", "textcat"])
-except OSError:
-    print("[HATA] Lütfen komut satırında 'python -m spacy download en_core_web_sm' komutunu çalıştırın.")
-    raise
+# The lookup lemmatizer never needs it.
+nlp = None
+_nlp_lock = threading.Lock()
 
-# --- PREPROCESSING FUNCTION ---
-def clean_text(text: str) -> str:
+
+def get_nlp():
+    global nlp
+    if nlp is None:
+        with _nlp_lock:
+            if nlp is None:
+                import spacy
+                try:
+                    nlp = spacy.load("en_core_web_sm", disable=["parser", "ner", "textcat"])
+                except OSError:
+                    print("[HATA] Lütfen komut satırında 'python -m spacy download en_core_web_sm' komutunu çalıştırın.")
+                    raise
+    return nlp
+
+
+# --- LEMMATIZER MODE ---
+# "spacy": full en_core_web_sm pipeline (default).
+# "lookup": precomputed table built by tools/build_lemma_table.py. It maps each
+# whitespace token of normalized text to its stop-word-filtered lemmas.
+LEMMATIZER = "spacy"
+_lemma_table = None
+
+
+def load_lemma_table(path: str) -> dict:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)["lemmas"]
+
+
+def set_lemmatizer(mode: str, table_path: str = None):
+    """Switch between the spaCy and lookup-table lemmatizers."""
+    global LEMMATIZER, _lemma_table
+    if mode == "lookup":
+        _lemma_table = load_lemma_table(table_path)
+    elif mode != "spacy":
+        raise ValueError(f"Unknown lemmatizer mode: {mode}")
+    LEMMATIZER = mode
+
+# --- ŞÜPHELİ ANAHTAR KELİMELER ---
+SUSPICIOUS_KEYWORDS = [
+    "account", "password", "verify", "login", "update", "confirm", "reward", "won", "bank", "security", "id", "delivery", "payment", "suspend", "locked", "urgent",
+    "click", "link", "free", "immediate", "now", "alert", "warning", "change", "win", "prize", "billing", "invoice", "card", "credit", "action required", "respond",
+    "claim", "suspicious", "fraud", "limited time", "expires", "personal", "confidential", "unauthorized", "access", "reset", "secure", "transaction", "balance", "due",
+    "overdue", "pending", "failed", "declined", "package", "tracking", "shipment", "offer", "deal", "discount", "gift", "voucher", "coupon", "exclusive",
+    "verify your identity", "update your information", "account verification", "login attempt", "security breach", "unusual activity", "contact us", "call now",
+    "text back", "reply", "subscription", "membership", "trial", "expiration", "renew", "funds", "transfer", "deposit", "withdrawal", "review", "confirm payment",
+    "validate", "authentication", "pin", "code", "OTP", "urgent action", "last chance", "time-sensitive", "act now", "don’t miss", "failure to respond",
+    "account closure", "verify now", "click here", "short link", "download", "install", "app", "survey", "bonus", "cash", "lottery", "sweepstakes", "charity",
+    "donation", "tax", "refund", "government", "IRS", "legal", "lawsuit", "warrant", "arrest", "debt", "collection", "pay now", "secure link",
+    "personal information", "SSN", "account number", "bank details", "password reset", "urgent update", "limited offer", "exclusive offer", "contact immediately"
+]
+
+
+def _normalize_keyword(word: str) -> str:
+    """Bring a keyword into the same form clean_text gives the message text."""
+    word = unicodedata.normalize('NFD', word.lower()).encode('ascii', 'ignore').decode('utf-8')
+    word = re.sub(r'[^a-z0-9\s]+', ' ', word)
+    return re.sub(r'\s+', ' ', word).strip()
+
+
+def _trie_pattern(words) -> str:
+    """
+    Regex alternation for words, factored into a character trie so the
+    engine tries one branch per position instead of every keyword in turn.
+    Longer keywords are preferred; shorter ones are reached by backtracking.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+
+    return build(trie)
+
+
+# Built once at import: every keyword in a single compiled pattern.
+# The lookahead lets finditer try every word boundary, so overlapping
+# keywords ("verify" / "verify your identity") are all seen in one pass.
+# An apostrophe reaches the message text in two forms: the ASCII path turns
+# "don't" into "don t", the Unicode path drops "’" and gives "dont". Each
+# keyword is matched in both spellings and reported under the first.
+_APOSTROPHE_RE = re.compile("['\u2018\u2019]")
+_KEYWORD_FORMS = {}     # spelling in the text -> keyword
+for _word in SUSPICIOUS_KEYWORDS:
+    _keyword = _normalize_keyword(_APOSTROPHE_RE.sub(' ', _word))
+    for _form in (_keyword, _normalize_keyword(_APOSTROPHE_RE.sub('', _word))):
+        _KEYWORD_FORMS.setdefault(_form, _keyword)
+_KEYWORDS = list(dict.fromkeys(_KEYWORD_FORMS.values()))
+_KEYWORD_ORDER = {w: i for i, w in enumerate(_KEYWORDS)}
+_KEYWORD_RE = re.compile(r'\b(?=(' + _trie_pattern(_KEYWORD_FORMS) + r')\b)')
+# Only the longest keyword starting at a position is reported, so each match
+# also stands for the shorter keywords that are word-prefixes of it.
+_KEYWORD_PREFIXES = {
+    w: list(dict.fromkeys(k for f, k in _KEYWORD_FORMS.items() if w == f or w.startswith(f + ' ')))
+    for w in _KEYWORD_FORMS
+}
+_ALERT_TAGS = {w: f" <ALERT_{w.upper()}> " for w in _KEYWORDS}
+
+
+def keyword_alerts(text: str) -> str:
+    """
+    ' <ALERT_...> ' tags for every suspicious keyword found in text, in
+    SUSPICIOUS_KEYWORDS order, using one linear scan of the string.
+    """
+    found = set()
+    for match in _KEYWORD_RE.finditer(text):
+        found.update(_KEYWORD_PREFIXES[match.group(1)])
+    if not found:
+        return ''
+    return ''.join(_ALERT_TAGS[w] for w in sorted(found, key=_KEYWORD_ORDER.__getitem__))
+
+
+# --- NORMALIZATION TABLES (built once) ---
+# Karakter filtresi: izin verilmeyen her ASCII karakter boşluğa çevrilir.
+# The ASCII fast path also folds case in the same translate pass.
+_DISALLOWED_CHAR = re.compile(r'[^a-zA-Z0-9\s<>$£₺]')
+_ASCII_FILTER = {c: ' ' for c in range(128) if _DISALLOWED_CHAR.match(chr(c))}
+_ASCII_FOLD = {**_ASCII_FILTER, **{ord(c): c.lower() for c in string.ascii_uppercase}}
+
+# HTML etiketleri, boşluk tekrarları ve uzatılmış karakterler ('cooool' -> 'cool')
+# tek geçişte. Removing a tag never joins two characters (the tag turns into a
+# space), so squeezing whitespace and elongations in the same scan is safe.
+_SQUEEZE_RE = re.compile(r'(?:\s*<.*?>)+\s*|\s\s+|(.)\1{2,}')
+
+# Anonimleştirme: URL/PHONE/MONEY/NUM in one left-to-right scan. Branch order
+# matches the old sequential re.sub calls. The old EMAIL and DOMAIN patterns need
+# '@' and '.', which the character filter has already removed, so they are gone.
+_MASK_RE = re.compile(
+    r'(?P<URL>http\S+|www\S+)'
+    r'|(?P<PHONE>\+?\d[\d\s\-\(\)]{4,}\d)'
+    r'|(?P<MONEY>\d+\s*(?:usd|eur|\$|£|tl|₺))'
+    r'|(?P<NUM>\d+)'
+)
+_MASK_TAGS = {name: f' {name} ' for name in _MASK_RE.groupindex}
+
+_PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation.replace("'", ""))
+
+
+def _squeeze(match):
+    return match.group(1) * 2 if match.group(1) else ' '
+
+
+def _mask(match):
+    return _MASK_TAGS[match.lastgroup]
+
+
+def normalize_text(text: str) -> str:
+    """
+    Everything clean_text does before lemmatization: de-accenting, character
+    filter, HTML/whitespace/elongation cleanup, keyword alerts, masking and
+    punctuation removal, using precompiled patterns and as few passes as possible.
+    """
     if not isinstance(text, str):
         return ""
-    text = text.lower()
-
-    # 2. Unicode Normalizasyonu ve Aksan Giderme (De-accenting)
-    try:
-        text = unicodedata.normalize('NFD', text).encode('ascii', 'ignore').decode('utf-8')
-    except:
-        pass
-
-    # 3. YENİ EKLEME: Non-ASCII ve HTML Karakterlerini Temizleme
-    # Amacı: SMS'lerde kalabilen gereksiz kodlama artıkları (örn: ÃƒÂ¯Ã‚Â¿Ã‚Â½) ve HTML etiketlerini kaldırmak.
-    text = re.sub(r'[^a-zA-Z0-9\s<>$£₺]+', ' ', text)
-    text = re.sub(r'<.*?>', ' ', text) # HTML etiketlerini kaldır
-    text = re.sub(r'(\s\s+)', ' ', text).strip()
-    
-    # 4. YENİ EKLEME: Tekrar Eden Noktalama İşaretlerini Normalleştirme ('!!!' -> '!')
-    text = re.sub(r'([!?])\1+', r'\1', text) 
-
-    # 5. Tekrarlanan Karakterleri Azaltma ('cooool' -> 'cool')
-    text = re.sub(r'(.)\1{2,}', r'\1\1', text) 
-    
-    # Şüpheli Anahtar Kelimeleri Etiketleme
-    suspicious_keywords = [
-        "account", "password", "verify", "login", "update", "confirm", "reward", "won", "bank", "security", "id", "delivery", "payment", "suspend", "locked", "urgent",
-        "click", "link", "free", "immediate", "now", "alert", "warning", "change", "win", "prize", "billing", "invoice", "card", "credit", "action required", "respond",
-        "claim", "suspicious", "fraud", "limited time", "expires", "personal", "confidential", "unauthorized", "access", "reset", "secure", "transaction", "balance", "due",
-        "overdue", "pending", "failed", "declined", "package", "tracking", "shipment", "offer", "deal", "discount", "gift", "voucher", "coupon", "exclusive", 
-        "verify your identity", "update your information", "account verification", "login attempt", "security breach", "unusual activity", "contact us", "call now", 
-        "text back", "reply", "subscription", "membership", "trial", "expiration", "renew", "funds", "transfer", "deposit", "withdrawal", "review", "confirm payment", 
-        "validate", "authentication", "pin", "code", "OTP", "urgent action", "last chance", "time-sensitive", "act now", "don’t miss", "failure to respond", 
-        "account closure", "verify now", "click here", "short link", "download", "install", "app", "survey", "bonus", "cash", "lottery", "sweepstakes", "charity", 
-        "donation", "tax", "refund", "government", "IRS", "legal", "lawsuit", "warrant", "arrest", "debt", "collection", "pay now", "secure link", 
-        "personal information", "SSN", "account number", "bank details", "password reset", "urgent update", "limited offer", "exclusive offer", "contact immediately"
-    ]
-    for word in suspicious_keywords:
-        if word in text:
-            text += f" <ALERT_{word.upper()}> " 
-
-    # Anonimleştirme
-    text = re.sub(r'http\S+|www\S+', ' <URL> ', text)
-    text = re.sub(r'\S+@\S+', ' <EMAIL> ', text)
-    text = re.sub(r'(\+?\d[\d\s\-\(\)]{4,}\d)', ' <PHONE> ', text) 
-    text = re.sub(r'\b[a-z0-9.-]+\.[a-z]{2,}\b', ' <DOMAIN> ', text) 
-    text = re.sub(r'\d+\s*(usd|eur|\$|£|tl|₺)', ' <MONEY> ', text)
-    text = re.sub(r'\d+', ' <NUM> ', text)
-    
-    # Noktalama Temizliği
-    text = text.translate(str.maketrans('', '', string.punctuation.replace("'", "")))
-    
-    # Ek Temizlik
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    # Lemmatizasyon ve Stop Word Kaldırma
-    doc = nlp(text)
+
+    # Unicode Normalizasyonu ve Aksan Giderme (De-accenting) + karakter filtresi
+    if text.isascii():
+        text = text.translate(_ASCII_FOLD)
+    else:
+        text = unicodedata.normalize('NFD', text.lower()).encode('ascii', 'ignore').decode('utf-8')
+        text = text.translate(_ASCII_FILTER)
+
+    text = _SQUEEZE_RE.sub(_squeeze, text).strip()
+
+    # Şüpheli Anahtar Kelimeleri Etiketleme (maskelemeden etkilenmezler)
+    alerts = keyword_alerts(text)
+
+    text = _MASK_RE.sub(_mask, text) + alerts
+
+    # Noktalama Temizliği + Ek Temizlik
+    return ' '.join(text.translate(_PUNCTUATION_TABLE).split())
+
+
+def _lemmas(doc) -> str:
+    stop_words = get_stopwords()
     tokens = []
     for token in doc:
         lemma = token.lemma_
-        if lemma not in english_stopwords and len(lemma) > 1:
+        if lemma not in stop_words and len(lemma) > 1:
             tokens.append(lemma)
-            
-    return ' '.join(tokens)
\ No newline at end of file
+
+    return ' '.join(tokens)
+
+
+def group_lemmas_by_word(doc):
+    """
+    Yield (whitespace_token, filtered_lemmas) for a spaCy doc, merging the
+    sub-tokens spaCy splits a word into ('dont' -> 'do', 'nt').
+    """
+    stop_words = get_stopwords()
+    word, lemmas = [], []
+    for token in doc:
+        word.append(token.text)
+        lemma = token.lemma_
+        if lemma not in stop_words and len(lemma) > 1:
+            lemmas.append(lemma)
+        if token.whitespace_ or token.i == len(doc) - 1:
+            yield ''.join(word), ' '.join(lemmas)
+            word, lemmas = [], []
+
+
+def _lookup_lemmas(text: str) -> str:
+    stop_words = get_stopwords()
+    tokens = []
+    for word in text.split():
+        lemmas = _lemma_table.get(word)
+        if lemmas is None:
+            # Unknown to the table: keep the token itself, filtered like a lemma
+            lemmas = word if word not in stop_words and len(word) > 1 else ''
+        if lemmas:
+            tokens.append(lemmas)
+
+    return ' '.join(tokens)
+
+
+def lemmatize(text: str) -> str:
+    """Lemmatizasyon ve Stop Word Kaldırma."""
+    if LEMMATIZER == "lookup":
+        return _lookup_lemmas(text)
+    return _lemmas(get_nlp()(text))
+
+
+def lemma_disagreement(texts) -> tuple:
+    """
+    (disagreeing, total) whitespace tokens between the lookup table and
+    spaCy over the normalized form of texts. Needs both to be available.
+    """
+    if _lemma_table is None:
+        raise RuntimeError("No lemma table loaded. Call set_lemmatizer('lookup', path) first.")
+    disagreeing = total = 0
+    normalized = [normalize_text(t) for t in texts]
+    for doc in get_nlp().pipe(normalized):
+        for word, spacy_lemmas in group_lemmas_by_word(doc):
+            total += 1
+            if _lookup_lemmas(word) != spacy_lemmas:
+                disagreeing += 1
+    return disagreeing, total
+
+
+# --- PREPROCESSING FUNCTION ---
+def clean_text(text: str) -> str:
+    if not isinstance(text, str):
+        return ""
+    return lemmatize(normalize_text(text))
+
+
+def clean_texts(texts, batch_size: int = 256, n_process: int = 1) -> list:
+    """
+    Batch version of clean_text: same tokens, but all messages go through
+    nlp.pipe so spaCy batches them and can spread them over n_process worker
+    processes.
+    """
+    return lemmatize_texts([normalize_text(t) for t in texts], batch_size, n_process)
+
+
+def lemmatize_texts(normalized, batch_size: int = 256, n_process: int = 1) -> list:
+    """
+    lemmatize() over already normalized texts in one nlp.pipe run. Workers are
+    started on every call, so inputs smaller than batch_size * n_process are
+    lemmatized in-process.
+    """
+    if LEMMATIZER == "lookup":
+        return [_lookup_lemmas(t) for t in normalized]
+    if n_process > 1 and len(normalized) < batch_size * n_process:
+        n_process = 1
+    docs = get_nlp().pipe(normalized, batch_size=batch_size, n_process=n_process)
+    return [_lemmas(doc) for doc in docs]
@@ -0,0 +1,209 @@
+# components/server.py
+"""
+Headless SMS classification server: the network receiver, the ingest queue
+and the engine without the desktop UI, for gateways that use the detector
+as an inline filter.
+
+    python -m components.server [--port 65432] [--http-port 8765] [--unix-path PATH]
+                                [--udp-port PORT] [--workers 2] [--stats-interval 10]
+
+Clients send frames as described in components.framing. A frame with an
+"id" is a request and is answered on the same connection with one JSON line:
+
+    {"id": ..., "label": "smishing", "score": 1.87, "campaign": 12,
+     "indicators": {"urls": [...], "emails": [...], "phones": [...], "domains": [...]}}
+
+or {"id": ..., "error": "..."}. "score" is the model's confidence in the
+label: for the shipped SVM an uncalibrated one-vs-one margin (0 = on the
+boundary with the closest other label), not a probability.
+
+Requests can be pipelined; responses come back as verdicts are ready, not
+necessarily in request order, so clients match them by id.
+
+With --http-port the same path is also exposed over HTTP (see
+components.http_server). --unix-path adds a Unix domain socket with the
+same framing and replies for gateways on this host; --udp-port accepts
+fire-and-forget datagrams (no replies). --record keeps an ingest log of
+all traffic for tools/replay.py.
+"""
+import sys
+import json
+import time
+import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from components import engine
+from components.ingest_queue import IngestQueue, BATCH_SIZE, MAX_WAIT_MS, MAX_DEPTH, POLICIES, SPILL_PATH
+from components.network_sms_receiver import NetworkSMSReceiver, PORT, IDLE_TIMEOUT
+from components.http_server import HTTPClassifyServer, HTTP_HOST
+from components.ingest_log import IngestLogWriter
+
+INDICATORS = ("urls", "emails", "phones", "domains")
+
+
+# ================================================================
+#                      RESPONSES
+# ================================================================
+def verdict_payload(result):
+    """Response body for one classification result."""
+    return {
+        "label": result["label"],
+        "score": result["score"],
+        "campaign": result["campaign"],
+        "indicators": {key: result[key] for key in INDICATORS},
+    }
+
+
+def reply_to_batch(messages, future):
+    """
+    Done-callback for a classification Future: answer every message of the
+    batch that came with a reply handle, in the order the results arrive.
+    """
+    error = None if not future.cancelled() else "cancelled"
+    if error is None and future.exception() is not None:
+        error = str(future.exception()) or type(future.exception()).__name__
+    results = future.result() if error is None else None
+
+    for i, message in enumerate(messages):
+        reply = message.get("reply")
+        if reply is None:
+            continue
+        reply({"error": error} if error is not None else verdict_payload(results[i]))
+
+
+def reply_shed(message, reason):
+    """IngestQueue on_shed hook: tell the client its request was not classified."""
+    reply = message.get("reply") if isinstance(message, dict) else None
+    if reply is not None:
+        reply({"error": f"overloaded ({reason})"})
+
+
+# ================================================================
+#                      HEADLESS SERVER
+# ================================================================
+class SMSServer:
+    """Receiver -> ingest queue -> classification pool, with verdicts sent back to clients."""
+
+    def __init__(self, port=PORT, workers=2, batch_size=BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                 max_depth=MAX_DEPTH, policy="block", spill_path=SPILL_PATH,
+                 idle_timeout=IDLE_TIMEOUT, http_port=None, http_host=HTTP_HOST,
+                 unix_path=None, udp_port=None, tcp=True, record_path=None, verbose=False):
+        self.port = port
+        self.verbose = verbose
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Classifier")
+        self.ingest = IngestQueue(
+            self._classify, batch_size=batch_size, max_wait_ms=max_wait_ms,
+            max_depth=max_depth, max_in_flight=workers, policy=policy,
+            spill_path=spill_path, on_shed=reply_shed,
+        )
+        self.recorder = IngestLogWriter(record_path) if record_path else None
+        self.receiver = NetworkSMSReceiver(None, self.ingest.put, self._log, idle_timeout=idle_timeout,
+                                           unix_path=unix_path, udp_port=udp_port, tcp=tcp,
+                                           recorder=self.recorder)
+        self.http = None
+        if http_port:
+            self.http = HTTPClassifyServer(self.ingest.put, port=http_port, host=http_host,
+                                           log_callback=self._log, stats_callback=self.stats,
+                                           recorder=self.recorder)
+
+    def _classify(self, messages):
+        future = self.pool.submit(engine.classify_batch, [m["message"] for m in messages])
+        future.add_done_callback(functools.partial(reply_to_batch, messages))
+        return future
+
+    def _log(self, text, label="Info"):
+        if self.verbose or label == "Error":
+            print(f"[{label}] {text}", flush=True)
+
+    def start(self):
+        """Load the model, then start accepting connections."""
+        engine.warm_up()
+        engine.ready.wait()
+        if not engine.is_loaded():
+            raise RuntimeError("Model not loaded. Please ensure model files exist.")
+        self.ingest.start()
+        self.receiver.start_server(self.port)
+        self.receiver.listening.wait(10)
+        if not self.receiver.is_running:
+            raise RuntimeError("Receiver failed to start (port in use?)")
+        if self.http:
+            self.http.start_server()
+            self.http.listening.wait(10)
+            if not self.http.is_running:
+                raise RuntimeError("HTTP server failed to start (port in use?)")
+            print(f"HTTP endpoint on http://{self.http.host}:{self.http.port}", flush=True)
+        # Bound ports, so an ephemeral port (0) is reported as the real one
+        where = [f"tcp:{self.receiver.tcp_port}"] if self.receiver.tcp else []
+        if self.receiver.unix_path:
+            where.append(f"unix:{self.receiver.unix_path}")
+        if self.receiver.udp_port:
+            where.append(f"udp:{self.receiver.udp_port}")
+        print(f"Serving on {', '.join(where)} (model ready in {engine.WARMUP_TIMINGS.get('total', 0.0):.1f}s)", flush=True)
+
+    def stop(self):
+        if self.http:
+            self.http.stop_server()
+        self.receiver.stop_server()
+        self.ingest.stop()
+        self.pool.shutdown(wait=True)
+        if self.recorder:
+            self.recorder.close()
+
+    def stats(self):
+        return {
+            "receiver": self.receiver.stats(),
+            "http": self.http.stats() if self.http else None,
+            "ingest": self.ingest.stats(),
+            "cache": engine.cache_stats(),
+            "campaigns": engine.campaign_stats(),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless SMS classification server.")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=2, help="classification threads")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--max-depth", type=int, default=MAX_DEPTH)
+    parser.add_argument("--policy", choices=POLICIES, default="block")
+    parser.add_argument("--spill-path", default=SPILL_PATH)
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT)
+    parser.add_argument("--http-port", type=int, default=0, help="also serve HTTP on this port (0 = off)")
+    parser.add_argument("--http-host", default=HTTP_HOST)
+    parser.add_argument("--unix-path", help="also listen on this Unix domain socket")
+    parser.add_argument("--udp-port", type=int, default=0, help="also accept UDP datagrams on this port (0 = off)")
+    parser.add_argument("--no-tcp", action="store_true", help="do not open the TCP port")
+    parser.add_argument("--record", metavar="PATH", help="append every incoming message to this ingest log")
+    parser.add_argument("--lemmatizer", choices=("spacy", "lookup"), default="spacy")
+    parser.add_argument("--stats-interval", type=float, default=0, help="print stats every N seconds (0 = off)")
+    parser.add_argument("--verbose", action="store_true", help="log every connection event")
+    args = parser.parse_args(argv)
+
+    if args.lemmatizer != "spacy":
+        engine.set_lemmatizer(args.lemmatizer)
+
+    server = SMSServer(
+        port=args.port, workers=args.workers, batch_size=args.batch_size,
+        max_wait_ms=args.max_wait_ms, max_depth=args.max_depth, policy=args.policy,
+        spill_path=args.spill_path, idle_timeout=args.idle_timeout,
+        http_port=args.http_port, http_host=args.http_host,
+        unix_path=args.unix_path, udp_port=args.udp_port, tcp=not args.no_tcp,
+        record_path=args.record, verbose=args.verbose,
+    )
+    try:
+        server.start()
+        while server.receiver.is_running:
+            time.sleep(args.stats_interval or 1)
+            if args.stats_interval:
+                print(json.dumps(server.stats()), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
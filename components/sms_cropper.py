@@ -1,29 +1,63 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import cv2
-import pytesseract
-from PIL import Image, ImageTk
+from PIL import Image, ImageOps, ImageTk
 import tkinter as tk
+from tkinter import ttk
+
+from components import ocr_backend
+from components.image_to_text import find_bubbles, ocr_bubble_texts, OCRCancelled
+
+PREVIEW_SIZE = (800, 600)
+POLL_MS = 50            # how often the window checks on the background worker
+EXIF_ORIENTATION = 0x0112
+
+# One background thread for every cropper window, for the life of the app:
+# its OCR engine (ocr_backend keeps one per thread) is loaded only once
+WORKER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Cropper-OCR")
+
+
+def load_preview(file_path, max_size=PREVIEW_SIZE):
+    """
+    Decode only as much of the image as the preview needs.
+    JPEGs are decoded at 1/2, 1/4 or 1/8 scale straight from the file
+    (draft mode), so a huge photo opens without decoding every pixel.
+    Returns (preview PIL image, preview/full-resolution scale).
+    """
+    img = Image.open(file_path)
+    width, height = img.size
+    if img.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8):
+        width, height = height, width   # stored sideways; OpenCV applies the rotation too
+    scale = min(max_size[0] / width, max_size[1] / height, 1.0)
+    target = (max(1, int(width * scale)), max(1, int(height * scale)))
+    img.draft("RGB", target if img.size == (width, height) else target[::-1])
+    img = ImageOps.exif_transpose(img.convert("RGB"))
+    if img.size != target:
+        img = img.resize(target, Image.LANCZOS, reducing_gap=2.0)
+    return img, scale
 
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
 class SMSCropper:
-    def __init__(self, master, file_path, callback):
+    def __init__(self, master, file_path, callback, on_messages=None):
+        """
+        :param callback: receives the text of a hand-drawn selection.
+        :param on_messages: optional; receives the list of texts of all
+                            detected bubbles ("Use Detected Bubbles" button).
+
+        The window opens on a reduced preview; the full image is loaded,
+        searched for bubbles and OCR'd on a background thread, so Tk never
+        waits for OpenCV or Tesseract.
+        """
         self.master = master
         self.file_path = file_path
         self.callback = callback
+        self.on_messages = on_messages
         self.start_x = None
         self.start_y = None
         self.rect_id = None
 
-        # Load image
-        self.img_cv = cv2.imread(file_path)
-        img_rgb = cv2.cvtColor(self.img_cv, cv2.COLOR_BGR2RGB)
-        self.img_pil = Image.fromarray(img_rgb)
-
-        # Resize if too big
-        max_w, max_h = 800, 600
-        self.scale = min(max_w / self.img_pil.width, max_h / self.img_pil.height, 1.0)
-        new_size = (int(self.img_pil.width * self.scale), int(self.img_pil.height * self.scale))
-        self.img_pil = self.img_pil.resize(new_size, Image.LANCZOS)
+        self.img_pil, self.scale = load_preview(file_path)
 
         self.top = tk.Toplevel(master)
         self.top.title("Select SMS Bubble")
@@ -33,21 +67,139 @@ class SMSCropper:
         self.img_tk = ImageTk.PhotoImage(self.img_pil)
         self.canvas.create_image(0, 0, anchor="nw", image=self.img_tk)
 
+        # Status row: progress, cancel, and the detected-bubbles action
+        bar = tk.Frame(self.top)
+        bar.pack(fill="x")
+        self.status = tk.Label(bar, text="Detecting bubbles...", anchor="w")
+        self.status.pack(side="left", fill="x", expand=True, padx=4)
+        self.cancel_btn = tk.Button(bar, text="Cancel", command=self.cancel_ocr, state="disabled")
+        self.cancel_btn.pack(side="right")
+        self.progress = ttk.Progressbar(bar, length=160, mode="indeterminate")
+        self.progress.pack(side="right", padx=4)
+        self.bubbles_btn = None
+        if self.on_messages:
+            self.bubbles_btn = tk.Button(self.top, text="Use Detected Bubbles", state="disabled",
+                                         command=self.use_bubbles)
+            self.bubbles_btn.pack(fill="x")
+
+        # The full-resolution load runs first on WORKER, OCR jobs queue behind it
+        self.img_cv = None
+        self.bubbles = []
+        self.loading = WORKER.submit(self._load_full_image)
+        self.job = None             # (future, cancel event, on_done) of the running OCR
+        self.bubbles_done = 0
+        self.bubbles_total = 0
+        self.top.after(POLL_MS, self._poll_loading)
+        self.top.protocol("WM_DELETE_WINDOW", self.close)
+
         self.canvas.bind("<ButtonPress-1>", self.on_mouse_down)
         self.canvas.bind("<B1-Motion>", self.on_mouse_drag)
         self.canvas.bind("<ButtonRelease-1>", self.on_mouse_up)
 
+    # ---------- Background loading ----------
+    def _load_full_image(self):
+        img = cv2.imread(self.file_path)
+        if img is None:
+            raise ValueError(f"cannot read image: {self.file_path}")
+        return img, find_bubbles(img)
+
+    def _poll_loading(self):
+        if not self.top.winfo_exists():
+            return
+        if not self.loading.done():
+            self.top.after(POLL_MS, self._poll_loading)
+            return
+        try:
+            self.img_cv, self.bubbles = self.loading.result()
+        except Exception as e:
+            self.status.configure(text=f"Could not load image: {e}")
+            return
+
+        # Outline the bubbles found automatically; a drag still selects by hand
+        for x, y, w, h in self.bubbles:
+            self.canvas.create_rectangle(x * self.scale, y * self.scale, (x + w) * self.scale, (y + h) * self.scale,
+                                         outline="#4E7CA1", width=1, dash=(4, 2))
+        if self.job is None:
+            self.status.configure(text=f"{len(self.bubbles)} bubbles found. Drag to select one by hand.")
+        if self.bubbles_btn is not None and self.bubbles:
+            self.bubbles_btn.configure(text=f"Use Detected Bubbles ({len(self.bubbles)})",
+                                       state="normal" if self.job is None else "disabled")
+
+    # ---------- Background OCR ----------
+    def _start_job(self, fn, on_done, message):
+        cancel = threading.Event()
+        self.job = (WORKER.submit(fn, cancel), cancel, on_done)
+        self.status.configure(text=message)
+        self.progress.configure(mode="indeterminate")
+        self.progress.start(15)
+        self.cancel_btn.configure(state="normal")
+        if self.bubbles_btn is not None:
+            self.bubbles_btn.configure(state="disabled")
+        self.top.after(POLL_MS, self._poll_job, self.job)
+
+    def _poll_job(self, job):
+        # A cancelled job's poll stops here, even if a new job has started since
+        if self.job is not job or not self.top.winfo_exists():
+            return
+        future, cancel, on_done = job
+        if self.bubbles_total:
+            # Bubble count known: switch to real progress
+            self.progress.stop()
+            self.progress.configure(mode="determinate", maximum=self.bubbles_total, value=self.bubbles_done)
+            self.status.configure(text=f"Reading bubble {self.bubbles_done}/{self.bubbles_total}...")
+        if not future.done():
+            self.top.after(POLL_MS, self._poll_job, job)
+            return
+        self._end_job()
+        try:
+            on_done(future.result())
+        except OCRCancelled:
+            pass
+        except Exception as e:
+            self.status.configure(text=f"OCR failed: {e}")
+
+    def _end_job(self):
+        self.job = None
+        self.bubbles_done = self.bubbles_total = 0
+        self.progress.stop()
+        self.progress.configure(mode="determinate", value=0)
+        self.cancel_btn.configure(state="disabled")
+        if self.bubbles_btn is not None and self.bubbles:
+            self.bubbles_btn.configure(state="normal")
+        self.status.configure(text="Drag to select a bubble.")
+
+    def cancel_ocr(self):
+        """Stop waiting for the running OCR; its result is discarded."""
+        if self.job is None:
+            return
+        self.job[1].set()
+        self._end_job()
+        self.status.configure(text="OCR cancelled. Drag to select a bubble.")
+
+    def close(self):
+        # The worker is shared: drop only this window's queued work
+        self.loading.cancel()
+        if self.job is not None:
+            self.job[0].cancel()
+            self.job[1].set()
+        self.top.destroy()
+
+    # ---------- Mouse selection ----------
     def on_mouse_down(self, event):
+        if self.job is not None:
+            return
         self.start_x, self.start_y = event.x, event.y
         if self.rect_id:
             self.canvas.delete(self.rect_id)
         self.rect_id = self.canvas.create_rectangle(self.start_x, self.start_y, self.start_x, self.start_y, outline="red", width=2)
 
     def on_mouse_drag(self, event):
-        if self.rect_id:
+        if self.rect_id and self.job is None:
             self.canvas.coords(self.rect_id, self.start_x, self.start_y, event.x, event.y)
 
     def on_mouse_up(self, event):
+        if self.job is not None or self.start_x is None:
+            return
         end_x, end_y = event.x, event.y
         x1, x2 = sorted([self.start_x, end_x])
         y1, y2 = sorted([self.start_y, end_y])
@@ -57,17 +209,40 @@ class SMSCropper:
         x2 = int(x2 / self.scale)
         y1 = int(y1 / self.scale)
         y2 = int(y2 / self.scale)
+        if x2 <= x1 or y2 <= y1:
+            return
 
-        crop = self.img_cv[y1:y2, x1:x2]
-        if crop.size == 0:
+        def read_selection(cancel):
+            # Queued behind the full-resolution load on the same thread
+            img, _ = self.loading.result()
+            crop = img[y1:y2, x1:x2]
+            if crop.size == 0 or cancel.is_set():
+                return ""
+            gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+            return ocr_backend.image_to_string(gray).strip()
+
+        def done(text):
+            self.callback(text if text else "[OCR failed: no text detected]")
+            self.close()
+
+        self._start_job(read_selection, done, "Reading selection...")
+
+    def use_bubbles(self):
+        if self.job is not None or self.img_cv is None:
             return
 
-        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
-        text = pytesseract.image_to_string(gray)
+        def read_bubbles(cancel):
+            def progress(done, total):
+                # Worker thread: only plain attributes here, the poll updates Tk
+                if not cancel.is_set():
+                    self.bubbles_done, self.bubbles_total = done, total
+            return ocr_bubble_texts(self.img_cv, boxes=self.bubbles, progress=progress, cancel=cancel)
 
-        if text.strip():
-            self.callback(text.strip())
-        else:
-            self.callback("[OCR failed: no text detected]")
+        def done(texts):
+            if texts:
+                self.on_messages(texts)
+            else:
+                self.callback("[OCR failed: no text detected]")
+            self.close()
 
-        self.top.destroy()
+        self._start_job(read_bubbles, done, "Reading bubbles...")
@@ -0,0 +1,96 @@
+# components/ui_dispatcher.py
+import queue
+import threading
+
+
+class UIDispatcher:
+    """
+    Single entry point for background threads that need to touch Tk.
+
+    Work is queued from any thread and run on the Tk thread once per tick,
+    instead of one root.after callback per event:
+      - call(fn, *args)            runs every call, in order (bounded per tick)
+      - call_latest(key, fn, ...)  keeps only the newest call per key (status text)
+      - batch(fn, item)            collects items; fn(items) runs once per tick
+    """
+
+    def __init__(self, root, tick_ms=33, max_calls_per_tick=200):
+        """
+        :param root: Tk root that owns the tick.
+        :param tick_ms: drain interval (~30 updates per second by default).
+        :param max_calls_per_tick: plain calls run per tick; the rest wait for the next one.
+        """
+        self.root = root
+        self.tick_ms = tick_ms
+        self.max_calls_per_tick = max_calls_per_tick
+
+        self._calls = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._latest = {}       # key -> (fn, args)
+        self._batches = {}      # fn -> [items]
+
+        self.ticks = 0
+        self.calls = 0
+        self.superseded = 0     # call_latest calls replaced before they ran
+        self.batched = 0
+        self.is_running = True
+
+        self.root.after(self.tick_ms, self._tick)
+
+    # ---------- Any thread ----------
+    def call(self, fn, *args):
+        self._calls.put((fn, args))
+
+    def call_latest(self, key, fn, *args):
+        with self._lock:
+            if key in self._latest:
+                self.superseded += 1
+            self._latest[key] = (fn, args)
+
+    def batch(self, fn, item):
+        with self._lock:
+            self._batches.setdefault(fn, []).append(item)
+
+    # ---------- Tk thread ----------
+    def _tick(self):
+        if not self.is_running:
+            return
+        # Reschedule first so a handler that opens a modal dialog does not stall the queue
+        self.root.after(self.tick_ms, self._tick)
+        self.ticks += 1
+
+        for _ in range(self.max_calls_per_tick):
+            try:
+                fn, args = self._calls.get_nowait()
+            except queue.Empty:
+                break
+            self.calls += 1
+            self._run(fn, *args)
+
+        with self._lock:
+            batches, self._batches = self._batches, {}
+            latest, self._latest = self._latest, {}
+        for fn, items in batches.items():
+            self.batched += len(items)
+            self._run(fn, items)
+        for fn, args in latest.values():
+            self._run(fn, *args)
+
+    @staticmethod
+    def _run(fn, *args):
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"⚠️ WARNING: UI update failed: {e}")
+
+    def stop(self):
+        self.is_running = False
+
+    def stats(self):
+        return {
+            "ticks": self.ticks,
+            "calls": self.calls,
+            "pending_calls": self._calls.qsize(),
+            "superseded": self.superseded,
+            "batched": self.batched,
+        }
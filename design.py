@@ -202,6 +202,7 @@ def build_ui():
 
         _log_label_widgets.append(preview_label)
         preview_label.full_message = full_text
+        frame.preview_label = preview_label
 
         # --- Selection Highlight Logic ---
         selected_colors = {"light": "#B0D8FF", "dark": "#1E3A5F"}
@@ -275,7 +276,7 @@ def build_ui():
         def delete_log():
             """Completely remove this log from UI and global memory."""
             try:
-                frame.destroy()
+                remove_log_message(frame)
                 if entry_data:
                     # Remove from this tab’s local list
                     if entry_data in _log_entries:
@@ -308,7 +309,6 @@ def build_ui():
 
         frame.bind("<Button-3>", show_context_menu)
         preview_label.bind("<Button-3>", show_context_menu)
-        root.bind_all("<Button-3>", lambda e: None, add="+")
 
 
         # --- Double-click logic ---
@@ -368,6 +368,13 @@ def build_ui():
 
         return frame
 
+    def remove_log_message(frame):
+        """Destroy a log card and forget its label, so font updates skip it."""
+        label = getattr(frame, "preview_label", None)
+        if label in _log_label_widgets:
+            _log_label_widgets.remove(label)
+        frame.destroy()
+
     # ============================================================== #
     #                      LOG DETAILS TAB                           #
     # ============================================================== #
@@ -575,7 +582,8 @@ def build_ui():
         details_text.tag_config("header_features", background="#3a3a3a", foreground="#ffffff", font=("Consolas", new_size, "bold"))
         details_text.tag_config("header_status", background="#3a3a3a", foreground="#ffffff", font=("Consolas", new_size, "bold"))
 
-        # update existing log labels
+        # update existing log labels (skipping any destroyed without remove_log_message)
+        _log_label_widgets[:] = [lbl for lbl in _log_label_widgets if lbl.winfo_exists()]
         for lbl in _log_label_widgets:
             lbl.configure(font=ctk.CTkFont("Consolas", new_size))
 
@@ -620,6 +628,7 @@ def build_ui():
         "auto_save_var": auto_save_var,
         "status_bar": status_bar,
         "add_log_message": add_log_message,
+        "remove_log_message": remove_log_message,
         "log_entries": _log_entries,  # ✅ Added line for app.py access
     }
 
@@ -0,0 +1,106 @@
+# tools/bench_campaigns.py
+"""
+Benchmark for components.campaigns.CampaignIndex at scale.
+
+Generates synthetic campaign traffic in normalized (masked) form: a set of
+template messages, each replayed with a different name, different NUM
+positions and an occasional swapped word, mixed with unrelated one-off
+messages. Reports insert throughput, lookup latency percentiles, how many
+campaigns each template ended up split into, and the memory the index uses.
+
+    python -m tools.bench_campaigns [--messages 1000000] [--templates 20000]
+"""
+import sys
+import time
+import random
+import argparse
+import resource
+
+from components.campaigns import CampaignIndex
+
+NAMES = ["john", "maria", "ahmed", "li", "fatma", "sam", "olga", "kemal", "ana", "ravi"]
+
+
+def make_vocabulary(rng, size=5000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choices(letters, k=rng.randint(3, 9))) for _ in range(size)]
+
+
+def make_templates(rng, vocabulary, count):
+    templates = []
+    for _ in range(count):
+        words = rng.choices(vocabulary, k=rng.randint(10, 24))
+        for pos in rng.sample(range(len(words)), k=2):
+            words[pos] = "NUM"
+        words.insert(1, "{name}")
+        templates.append(words)
+    return templates
+
+
+def make_variant(rng, template, vocabulary):
+    words = [rng.choice(NAMES) if w == "{name}" else w for w in template]
+    if rng.random() < 0.3:
+        words[rng.randrange(len(words))] = rng.choice(vocabulary)
+    return " ".join(words)
+
+
+def rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--templates", type=int, default=20_000)
+    parser.add_argument("--unique", type=float, default=0.2, help="fraction of one-off messages")
+    parser.add_argument("--max-campaigns", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng)
+    templates = make_templates(rng, vocabulary, args.templates)
+
+    index = CampaignIndex(max_campaigns=args.max_campaigns)
+    template_campaigns = {}
+    rss_before = rss_mb()
+
+    start = time.perf_counter()
+    for i in range(args.messages):
+        if rng.random() < args.unique:
+            index.add(" ".join(rng.choices(vocabulary, k=rng.randint(8, 24))))
+            continue
+        t = rng.randrange(len(templates))
+        campaign, _ = index.add(make_variant(rng, templates[t], vocabulary))
+        template_campaigns.setdefault(t, set()).add(campaign.id)
+        if (i + 1) % 100_000 == 0:
+            print(f"  indexed {i + 1:>9,} messages, {len(index):,} campaigns")
+    elapsed = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(args.lookups):
+        text = make_variant(rng, templates[rng.randrange(len(templates))], vocabulary)
+        t0 = time.perf_counter()
+        index.lookup(text)
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+
+    splits = [len(ids) for ids in template_campaigns.values()]
+    stats = index.stats()
+    print(f"messages:        {args.messages:,} ({args.templates:,} templates, {args.unique:.0%} one-off)")
+    print(f"insert:          {elapsed / args.messages * 1e6:8.1f} µs/message ({args.messages / elapsed:,.0f} msg/s)")
+    print(f"lookup p50/p99:  {percentile(latencies, 0.5) * 1e6:8.1f} / {percentile(latencies, 0.99) * 1e6:.1f} µs")
+    print(f"campaigns:       {stats['campaigns']:,} live, {stats['created']:,} created, {stats['evictions']:,} evicted")
+    print(f"template splits: {sum(splits) / len(splits):.2f} campaigns per template (1.00 = perfect)")
+    print(f"peak RSS growth: {rss_mb() - rss_before:,.0f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
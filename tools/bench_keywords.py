@@ -0,0 +1,65 @@
+# tools/bench_keywords.py
+"""
+Micro-benchmark for the suspicious keyword tagging step of clean_text.
+
+Compares the old per-keyword substring scan (list rebuilt on every call,
+one `word in text` per keyword, string growing with each alert) against
+the compiled single-pass tagger in components.preprocess.
+
+    python -m tools.bench_keywords [corpus.txt] [--repeat N]
+"""
+import os
+import sys
+import argparse
+import timeit
+
+from components.preprocess import SUSPICIOUS_KEYWORDS, keyword_alerts
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "sample_sms.txt")
+
+
+def legacy_keyword_tagging(text):
+    """The keyword loop as clean_text used to run it."""
+    suspicious_keywords = list(SUSPICIOUS_KEYWORDS)
+    for word in suspicious_keywords:
+        if word in text:
+            text += f" <ALERT_{word.upper()}> "
+    return text
+
+
+def compiled_keyword_tagging(text):
+    return text + keyword_alerts(text)
+
+
+def load_corpus(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip().lower() for line in f if line.strip()]
+
+
+def bench(func, messages, repeat):
+    def run():
+        for m in messages:
+            func(m)
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    return best / len(messages) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("corpus", nargs="?", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    messages = load_corpus(args.corpus)
+    legacy = bench(legacy_keyword_tagging, messages, args.repeat)
+    compiled = bench(compiled_keyword_tagging, messages, args.repeat)
+
+    print(f"messages:  {len(messages)}")
+    print(f"legacy:    {legacy:8.2f} µs/message")
+    print(f"compiled:  {compiled:8.2f} µs/message")
+    print(f"speedup:   {legacy / compiled:8.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
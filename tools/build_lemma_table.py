@@ -0,0 +1,80 @@
+# tools/build_lemma_table.py
+"""
+Build the lookup-table lemmatizer file from en_core_web_sm.
+
+Every message of the corpus is normalized with normalize_text and run
+through spaCy. For each whitespace token, the most frequent stop-word-
+filtered lemma sequence is stored in a gzip JSON table. The table is then
+checked against spaCy on the same corpus and the disagreement rate is
+printed. Use --check to only check an existing table.
+
+    python -m tools.build_lemma_table corpus.csv [--out lemma_lookup.json.gz]
+    python -m tools.build_lemma_table corpus.txt --check
+
+A .csv corpus is read with components.data_loader (TEXT column); any other
+file is read as one message per line.
+"""
+import sys
+import gzip
+import json
+import argparse
+from collections import Counter, defaultdict
+
+from components import preprocess
+from components.engine import LEMMA_TABLE_PATH
+
+
+def load_messages(path):
+    if path.lower().endswith(".csv"):
+        from components.data_loader import load_data
+        texts, _ = load_data(path)
+        return [str(t) for t in texts]
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def build_table(messages, batch_size=256, n_process=1):
+    nlp = preprocess.get_nlp()
+    counts = defaultdict(Counter)
+    normalized = [preprocess.normalize_text(m) for m in messages]
+    for doc in nlp.pipe(normalized, batch_size=batch_size, n_process=n_process):
+        for word, lemmas in preprocess.group_lemmas_by_word(doc):
+            counts[word][lemmas] += 1
+    return {word: c.most_common(1)[0][0] for word, c in counts.items()}
+
+
+def write_table(lemmas, path):
+    nlp = preprocess.get_nlp()
+    data = {
+        "model": f"{nlp.meta.get('lang')}_{nlp.meta.get('name')}-{nlp.meta.get('version')}",
+        "lemmas": lemmas,
+    }
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("corpus")
+    parser.add_argument("--out", default=LEMMA_TABLE_PATH)
+    parser.add_argument("--check", action="store_true", help="only report disagreement of an existing table")
+    parser.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    messages = load_messages(args.corpus)
+
+    if not args.check:
+        lemmas = build_table(messages, n_process=args.processes)
+        write_table(lemmas, args.out)
+        print(f"table:        {args.out} ({len(lemmas)} tokens)")
+
+    preprocess.set_lemmatizer("lookup", args.out)
+    disagreeing, total = preprocess.lemma_disagreement(messages)
+    rate = disagreeing / total if total else 0.0
+    print(f"messages:     {len(messages)}")
+    print(f"disagreement: {disagreeing}/{total} tokens ({rate:.2%}) vs spaCy")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# tools/check_normalize.py
+"""
+Golden-corpus check for components.preprocess.normalize_text.
+
+Runs the original step-by-step regex pipeline of clean_text (everything up
+to lemmatization) next to the fused normalize_text and reports every
+message where the two disagree. Besides the corpus file, random messages
+built from URL/phone/money/HTML/unicode fragments are checked too.
+Also prints the per-message cost of both.
+
+    python -m tools.check_normalize [corpus.txt] [--fuzz N] [--seed S]
+"""
+import re
+import sys
+import string
+import random
+import argparse
+import timeit
+import unicodedata
+
+from components.preprocess import keyword_alerts, normalize_text
+from tools.bench_keywords import DEFAULT_CORPUS
+
+
+def legacy_normalize(text):
+    """clean_text as it was before the fused pipeline, minus lemmatization."""
+    if not isinstance(text, str):
+        return ""
+    text = text.lower()
+
+    try:
+        text = unicodedata.normalize('NFD', text).encode('ascii', 'ignore').decode('utf-8')
+    except:
+        pass
+
+    text = re.sub(r'[^a-zA-Z0-9\s<>$£₺]+', ' ', text)
+    text = re.sub(r'<.*?>', ' ', text)
+    text = re.sub(r'(\s\s+)', ' ', text).strip()
+
+    text = re.sub(r'([!?])\1+', r'\1', text)
+
+    text = re.sub(r'(.)\1{2,}', r'\1\1', text)
+
+    text += keyword_alerts(text)
+
+    text = re.sub(r'http\S+|www\S+', ' <URL> ', text)
+    text = re.sub(r'\S+@\S+', ' <EMAIL> ', text)
+    text = re.sub(r'(\+?\d[\d\s\-\(\)]{4,}\d)', ' <PHONE> ', text)
+    text = re.sub(r'\b[a-z0-9.-]+\.[a-z]{2,}\b', ' <DOMAIN> ', text)
+    text = re.sub(r'\d+\s*(usd|eur|\$|£|tl|₺)', ' <MONEY> ', text)
+    text = re.sub(r'\d+', ' <NUM> ', text)
+
+    text = text.translate(str.maketrans('', '', string.punctuation.replace("'", "")))
+
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+FRAGMENTS = [
+    "http://", "https://bit.ly/", "www.", "www", "http", ".com", "@", "user@mail.com",
+    "+1 (800) 555-0199", "0800 123 4567", "12", "3456", "7", " usd", "usd", "eur", "$", "£", "tl", "₺",
+    "<b>", "</b>", "<", ">", "<<<", ">>>", "<a href='x'>", "\n", "\t", "  ", " ", "\x1c",
+    "!!!", "???", "cooool", "aaa", "zzzz", "...", "---", "'", "’",
+    "café", "naïve", "ÀÉÎ", "İstanbul", "ß", "K", "ǅ", "😀", "€",
+    "verify", "your", "identity", "account", "now", "OTP", "IRS", "ssn", "don't miss", "don’t miss",
+    "time-sensitive", "click here", "paid", "id", "win", "window", "free", "FREE",
+]
+
+
+def fuzz_messages(count, seed):
+    rng = random.Random(seed)
+    for _ in range(count):
+        parts = rng.choices(FRAGMENTS, k=rng.randint(1, 14))
+        yield "".join(p if rng.random() < 0.6 else p + " " for p in parts)
+
+
+def load_corpus(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def per_message_us(func, messages, repeat=20):
+    def run():
+        for m in messages:
+            func(m)
+    return min(timeit.repeat(run, number=1, repeat=repeat)) / len(messages) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("corpus", nargs="?", default=DEFAULT_CORPUS)
+    parser.add_argument("--fuzz", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    messages = corpus + list(fuzz_messages(args.fuzz, args.seed))
+
+    mismatches = 0
+    for message in messages:
+        expected = legacy_normalize(message)
+        actual = normalize_text(message)
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"MISMATCH {message!r}\n  legacy: {expected!r}\n  fused:  {actual!r}")
+
+    print(f"checked:   {len(messages)} messages ({len(corpus)} corpus, {args.fuzz} fuzz)")
+    print(f"mismatch:  {mismatches}")
+    print(f"legacy:    {per_message_us(legacy_normalize, corpus):8.2f} µs/message")
+    print(f"fused:     {per_message_us(normalize_text, corpus):8.2f} µs/message")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
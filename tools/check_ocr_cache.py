@@ -0,0 +1,113 @@
+# tools/check_ocr_cache.py
+"""
+Regression check for components.ocr_cache: no wrong texts on near misses.
+
+Draws synthetic conversation screenshots and checks two things:
+re-encoded, resized and brightened copies of a cached screenshot are hits
+that return its texts, and screenshots with the same layout but other text
+(whole bubbles rewritten, or a single link or word changed) are misses.
+
+    python -m tools.check_ocr_cache [--layouts 10] [--seed S]
+"""
+import sys
+import random
+import argparse
+
+import cv2
+import numpy as np
+
+from components.ocr_cache import OCRCache, dhash
+
+WORDS = ("your parcel is held pay the fee now at link account verify bank otp code "
+         "win prize free call mum dinner see you later tonight thanks ok meeting moved").split()
+WIDTH, HEIGHT = 1080, 2340
+
+
+def draw_screenshot(layout_seed, text_seed, dark=False, first_line=None):
+    """
+    A messaging-app screenshot: header, then bubbles down the screen.
+    The layout (bubble sizes and sides) comes from layout_seed, the words
+    from text_seed; first_line replaces the first line of the first bubble.
+    """
+    layout, words = random.Random(layout_seed), random.Random(text_seed)
+    ink = (240, 240, 240) if dark else (0, 0, 0)
+    img = np.full((HEIGHT, WIDTH, 3), (20, 20, 20) if dark else (255, 255, 255), np.uint8)
+    cv2.rectangle(img, (0, 0), (WIDTH, 160), (40, 40, 40) if dark else (240, 240, 240), -1)
+    cv2.putText(img, "+44 7700 900123", (200, 100), cv2.FONT_HERSHEY_SIMPLEX, 1.6, ink, 3)
+    y = 260
+    while y < HEIGHT - 400:
+        lines, right, bubble_width = layout.randint(1, 4), layout.random() < 0.5, layout.randint(500, 850)
+        x = WIDTH - bubble_width - 40 if right else 40
+        if dark:
+            colour = (120, 80, 40) if right else (60, 60, 60)
+        else:
+            colour = (250, 200, 120) if right else (235, 235, 235)
+        cv2.rectangle(img, (x, y), (x + bubble_width, y + lines * 60 + 40), colour, -1)
+        for i in range(lines):
+            text = " ".join(words.choice(WORDS) for _ in range(layout.randint(3, 5)))[:32]
+            if first_line is not None and y == 260 and i == 0:
+                text = first_line
+            cv2.putText(img, text, (x + 25, y + 60 + i * 60), cv2.FONT_HERSHEY_SIMPLEX, 1.3, ink, 2)
+        y += lines * 60 + 40 + layout.randint(30, 80)
+    return img
+
+
+def copies(img):
+    """The same screenshot as it comes back after being forwarded."""
+    for quality in (90, 70, 50):
+        yield f"jpeg q{quality}", cv2.imdecode(cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])[1], 1)
+    for scale in (0.75, 0.5, 0.33):
+        small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        yield f"resized {scale}", cv2.imdecode(cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, 75])[1], 1)
+    yield "brighter", cv2.convertScaleAbs(img, alpha=1.0, beta=8)
+
+
+def hamming(a, b):
+    return int(np.unpackbits(np.frombuffer(a, np.uint8) ^ np.frombuffer(b, np.uint8)).sum())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--layouts", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    cache = OCRCache(":memory:")
+    missed = wrong = hits = misses = 0
+    closest = None
+    for layout in range(args.seed, args.seed + args.layouts):
+        for dark in (False, True):
+            link = "pay the fee at bit.ly/abc12"
+            original = draw_screenshot(layout, 1, dark, link)
+            texts = [f"layout {layout} dark {dark}"]
+            cache.put(original, texts, "bubbles")
+
+            for name, copy in copies(original):
+                if cache.get(copy, "bubbles") == texts:
+                    hits += 1
+                else:
+                    missed += 1
+                    print(f"MISSED  layout {layout} dark={dark}: {name} copy not found")
+
+            others = [("other text", draw_screenshot(layout, 2, dark, link))]
+            others += [(f"first line {line!r}", draw_screenshot(layout, 1, dark, line))
+                       for line in ("pay the fee at bit.ly/xyz98", "pay the fine at bit.ly/abc12",
+                                    "pay the fee at bit.ly/abc13")]
+            for name, other in others:
+                distance = hamming(dhash(original), dhash(other))
+                closest = distance if closest is None else min(closest, distance)
+                if cache.get(other, "bubbles") is None:
+                    misses += 1
+                else:
+                    wrong += 1
+                    print(f"WRONG   layout {layout} dark={dark}: {name} ({distance} bits) got another screenshot's text")
+
+    print(f"copies:    {hits} found, {missed} missed")
+    print(f"different: {misses} missed as they should, {wrong} given wrong texts "
+          f"(closest hash {closest} bits apart)")
+    cache.close()
+    return 1 if wrong or missed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
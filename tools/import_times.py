@@ -0,0 +1,53 @@
+# tools/import_times.py
+"""
+Measure the import cost of the app's modules and heavy dependencies.
+
+Each module is imported in a fresh interpreter with `-X importtime`, so the
+numbers are cold-start costs and not hidden by an earlier import.
+
+    python -m tools.import_times [module ...]
+"""
+import sys
+import argparse
+import subprocess
+
+DEFAULT_MODULES = [
+    # App modules, as imported at startup
+    "components.engine", "components.preprocess", "components.network_sms_receiver",
+    "components.intro_screen", "design",
+    # Loaded lazily: warm-up threads or first image
+    "nltk.corpus", "spacy", "joblib", "sklearn.svm",
+    "components.sms_cropper", "components.image_to_text", "cv2", "pytesseract", "tesserocr", "PIL.ImageTk",
+]
+
+
+def import_time(module):
+    """Cumulative import time of module in seconds, or None if it failed to import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        return None
+    for line in reversed(proc.stderr.splitlines()):
+        # "import time: self [us] | cumulative | imported package"
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1e6
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        seconds = import_time(module)
+        shown = f"{seconds * 1000:9.1f} ms" if seconds is not None else "   (failed)"
+        print(f"{shown}  {module}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+# tools/loadgen.py
+"""
+Load generator for the network receiver (request/response mode).
+
+Opens N concurrent TCP clients on localhost that replay a corpus as framed
+requests at a fixed total rate, and reports sustained throughput, end-to-end
+latency percentiles, failures and the server's CPU and memory use.
+
+    python -m tools.loadgen --spawn-server [--clients 50] [--rate 2000] [--duration 20]
+    python -m tools.loadgen --port 65432 --server-pid 1234
+
+The schedule is open-loop: each request has a planned send time and latency
+is measured from that time, so a stalled server shows up as latency instead
+of silently lowering the offered load.
+"""
+import os
+import sys
+import json
+import time
+import shlex
+import socket
+import asyncio
+import argparse
+import itertools
+import subprocess
+
+from components.framing import encode_line
+
+try:
+    import resource     # POSIX only: open file limit check
+except ImportError:
+    resource = None
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "sample_sms.txt")
+
+
+def load_corpus(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+# ================================================================
+#                      SERVER PROCESS
+# ================================================================
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(port, extra_args=""):
+    """Start `python -m components.server` and wait until it accepts connections."""
+    cmd = [sys.executable, "-m", "components.server", "--port", str(port)] + shlex.split(extra_args)
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in proc.stdout:
+        print(f"  server: {line.rstrip()}")
+        if line.startswith("Serving on"):
+            return proc
+    raise RuntimeError(f"server exited with code {proc.wait()}")
+
+
+class ProcessSampler:
+    """CPU seconds and RSS of a process, from /proc (Linux)."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self.peak_rss = 0
+
+    def cpu_seconds(self):
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / self.ticks   # utime + stime
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def rss_mb(self):
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        rss = int(line.split()[1]) / 1024
+                        self.peak_rss = max(self.peak_rss, rss)
+                        return rss
+        except OSError:
+            pass
+        return None
+
+
+# ================================================================
+#                      CLIENTS
+# ================================================================
+class Stats:
+    def __init__(self):
+        self.sent = 0
+        self.ok = 0
+        self.errors = 0           # error responses (overloaded, empty, ...)
+        self.timeouts = 0         # no response before the end
+        self.connect_failures = 0
+        self.latencies = []
+
+
+async def run_client(client_id, host, port, corpus, interval, start_at, stop_at, stats, pipeline, grace):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        stats.connect_failures += 1
+        return
+
+    outstanding = {}              # request id -> planned send time
+    room = asyncio.Semaphore(pipeline)
+
+    async def read_responses():
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            response = json.loads(line)
+            planned = outstanding.pop(response.get("id"), None)
+            if planned is None:
+                continue
+            room.release()
+            if "error" in response:
+                stats.errors += 1
+            else:
+                stats.ok += 1
+                stats.latencies.append(time.monotonic() - planned)
+
+    reading = asyncio.ensure_future(read_responses())
+    messages = itertools.cycle(corpus[client_id % len(corpus):] + corpus[:client_id % len(corpus)])
+    try:
+        for seq in itertools.count():
+            planned = start_at + seq * interval
+            if planned >= stop_at:
+                break
+            delay = planned - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await room.acquire()
+            request_id = f"{client_id}-{seq}"
+            outstanding[request_id] = planned
+            writer.write(encode_line({"id": request_id, "sender": f"loadgen-{client_id}", "message": next(messages)}))
+            stats.sent += 1
+            await writer.drain()
+
+        # Give the last requests time to come back
+        deadline = time.monotonic() + grace
+        while outstanding and time.monotonic() < deadline and not reading.done():
+            await asyncio.sleep(0.01)
+    except ConnectionError:
+        pass
+    finally:
+        stats.timeouts += len(outstanding)
+        reading.cancel()
+        writer.close()
+
+
+async def run_load(args, corpus):
+    stats = Stats()
+    interval = args.clients / args.rate       # seconds between sends of one client
+    start = time.monotonic() + 0.2
+    stop_at = start + args.duration
+    clients = [
+        run_client(i, args.host, args.port, corpus, interval,
+                   start + i * interval / args.clients,  # spread clients over one interval
+                   stop_at, stats, args.pipeline, args.grace)
+        for i in range(args.clients)
+    ]
+    await asyncio.gather(*clients)
+    return stats, time.monotonic() - start
+
+
+# ================================================================
+#                      REPORT
+# ================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=65432)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=1000, help="total requests per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load")
+    parser.add_argument("--pipeline", type=int, default=64, help="max outstanding requests per client")
+    parser.add_argument("--grace", type=float, default=5, help="seconds to wait for late responses")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--spawn-server", action="store_true", help="start components.server on a free port")
+    parser.add_argument("--server-args", default="", help="extra arguments for the spawned server")
+    parser.add_argument("--server-pid", type=int, help="pid of an already running server to sample")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    server = None
+    if args.spawn_server:
+        args.port = free_port()
+        server = spawn_server(args.port, args.server_args)
+    pid = server.pid if server else args.server_pid
+    sampler = ProcessSampler(pid) if pid else None
+
+    cpu_before = sampler.cpu_seconds() if sampler else None
+    limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0] if resource else None
+    if limit is not None and args.clients + 32 > limit:
+        print(f"⚠️ WARNING: {args.clients} clients may exceed the open file limit ({limit}).")
+
+    async def sample_memory():
+        while True:
+            sampler.rss_mb()
+            await asyncio.sleep(0.5)
+
+    async def run():
+        sampling = asyncio.ensure_future(sample_memory()) if sampler else None
+        try:
+            return await run_load(args, corpus)
+        finally:
+            if sampling:
+                sampling.cancel()
+
+    try:
+        stats, elapsed = asyncio.run(run())
+        cpu_after = sampler.cpu_seconds() if sampler else None
+        rss = sampler.rss_mb() if sampler else None
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+
+    latencies = sorted(stats.latencies)
+    answered = stats.ok + stats.errors
+    report = {
+        "clients": args.clients,
+        "target_rate": args.rate,
+        "duration_s": round(elapsed, 2),
+        "sent": stats.sent,
+        "ok": stats.ok,
+        "errors": stats.errors,
+        "timeouts": stats.timeouts,
+        "connect_failures": stats.connect_failures,
+        "throughput_msg_s": round(answered / elapsed, 1) if elapsed else 0.0,
+        "latency_ms_p50": round(percentile(latencies, 0.50) * 1000, 2),
+        "latency_ms_p95": round(percentile(latencies, 0.95) * 1000, 2),
+        "latency_ms_p99": round(percentile(latencies, 0.99) * 1000, 2),
+        "latency_ms_max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+    if cpu_before is not None and cpu_after is not None:
+        report["server_cpu_percent"] = round((cpu_after - cpu_before) / elapsed * 100, 1)
+    if rss is not None:
+        report["server_rss_mb"] = round(rss, 1)
+        report["server_peak_rss_mb"] = round(sampler.peak_rss, 1)
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        for key, value in report.items():
+            print(f"{key:22} {value}")
+    failed = stats.errors + stats.timeouts + stats.connect_failures
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# tools/ocr_batch.py
+"""
+OCR a folder of reported screenshots and classify the text.
+
+Images are preprocessed and OCR'd on a process pool; whatever finishes
+together is classified as one batch, so verdicts stream out while the
+rest of the folder is still being read.
+
+    python -m tools.ocr_batch screenshots/ [more.png ...] [--workers 8] [--out verdicts.jsonl]
+    python -m tools.ocr_batch screenshots/ --bubbles     # one message per detected bubble
+    python -m tools.ocr_batch screenshots/ --cache ocr_cache.sqlite
+
+With --cache, screenshots seen before (even re-encoded or resized) are
+recognized by perceptual hash and not OCR'd again; their text then hits the
+engine's verdict cache as well.
+"""
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+
+from components import engine
+from components.image_to_text import iter_ocr_batches, list_images
+from components.ocr_cache import OCRCache
+from components.ocr_backend import BACKENDS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="image files or directories of images")
+    parser.add_argument("--workers", type=int, default=None, help="OCR processes (default: CPU count)")
+    parser.add_argument("--ocr-backend", choices=BACKENDS, default="auto",
+                        help="tesserocr keeps one engine per worker; pytesseract starts tesseract per image")
+    parser.add_argument("--bubbles", action="store_true", help="split screenshots into message bubbles")
+    parser.add_argument("--cache", metavar="PATH", help="perceptual-hash OCR cache (SQLite file)")
+    parser.add_argument("--cache-entries", type=int, default=5000)
+    parser.add_argument("--lemmatizer", choices=("spacy", "lookup"), default="spacy")
+    parser.add_argument("--out", metavar="PATH", help="write one JSON line per image")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args(argv)
+
+    total = len(list_images(args.paths))
+    if not total:
+        print("No images found.")
+        return 1
+
+    if args.lemmatizer != "spacy":
+        engine.set_lemmatizer(args.lemmatizer)
+    # The model loads while the first images are OCR'd
+    engine.warm_up()
+
+    cache = OCRCache(args.cache, max_entries=args.cache_entries) if args.cache else None
+    before = cache.stats() if cache is not None else None
+
+    labels = Counter()
+    failed = empty = done = 0
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+    start = time.perf_counter()
+    try:
+        for batch in iter_ocr_batches(args.paths, args.workers, args.ocr_backend, args.bubbles, args.cache):
+            done += len({path for path, _, _ in batch})
+            readable = [(path, text) for path, text, error in batch if text]
+            for path, text, error in batch:
+                if error:
+                    failed += 1
+                    print(f"⚠️ WARNING: {path}: {error}")
+                elif not text:
+                    empty += 1
+            if not readable:
+                continue
+
+            engine.ready.wait()
+            results = engine.classify_batch([text for _, text in readable])
+            for (path, text), result in zip(readable, results):
+                labels[result["label"]] += 1
+                if not args.quiet:
+                    print(f"[{done}/{total}] {engine.display_label(result['label']):9} {path}")
+                if out:
+                    out.write(json.dumps({"path": path, "text": text, "label": result["label"],
+                                          "score": result["score"], "campaign": result["campaign"]},
+                                         ensure_ascii=False) + "\n")
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"images:    {total:,} in {elapsed:.1f}s ({total / elapsed:.1f} images/s)")
+    print(f"messages:  {sum(labels.values()):,} classified, no text: {empty:,}, failed: {failed:,}")
+    print("labels:    " + (", ".join(f"{label} {n:,}" for label, n in labels.most_common()) or "-"))
+    if cache is not None:
+        # The workers update the counters in the cache file
+        after = cache.stats()
+        hits = after["total_hits"] - before["total_hits"]
+        lookups = hits + after["total_misses"] - before["total_misses"]
+        print(f"OCR cache: {hits:,}/{lookups:,} hits ({hits / lookups if lookups else 0.0:.1%}), "
+              f"{after['size']:,} entries, {after['total_evictions'] - before['total_evictions']:,} evicted")
+        cache.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
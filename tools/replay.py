@@ -0,0 +1,146 @@
+# tools/replay.py
+"""
+Replay an ingest log (components.ingest_log) through the engine.
+
+    python -m tools.replay traffic.smslog                  # as fast as possible
+    python -m tools.replay traffic.smslog --speed 1        # original timing
+    python -m tools.replay traffic.smslog --speed 10 --verdicts out.jsonl
+    python -m tools.replay traffic.smslog --profile replay.prof
+
+At original (or scaled) speed, messages go through an IngestQueue exactly as
+received traffic does, so micro-batching and queueing behave as in
+production. Flat out, the log is cut into fixed batches for classify_batch.
+--verdicts writes one JSON line per message, to diff two engine versions on
+identical traffic.
+"""
+import sys
+import json
+import time
+import argparse
+import cProfile
+from collections import Counter
+
+from components import engine
+from components.ingest_log import read_log
+from components.ingest_queue import IngestQueue, BATCH_SIZE, MAX_WAIT_MS
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def replay_max_speed(records, batch_size, on_batch):
+    batch_times = []
+    for i in range(0, len(records), batch_size):
+        batch = records[i:i + batch_size]
+        t0 = time.perf_counter()
+        results = engine.classify_batch([text for _, _, text in batch])
+        batch_times.append(time.perf_counter() - t0)
+        on_batch(batch, results)
+    return batch_times
+
+
+def replay_timed(records, speed, batch_size, max_wait_ms, on_batch):
+    """Feed records at their recorded pace (divided by speed) through an IngestQueue."""
+    def process(batch):
+        on_batch(batch, engine.classify_batch([text for _, _, text in batch]))
+
+    queue = IngestQueue(process, batch_size=batch_size, max_wait_ms=max_wait_ms,
+                        max_depth=len(records) + 1, max_in_flight=1)
+    queue.start()
+    first = records[0][0]
+    start = time.perf_counter()
+    for record in records:
+        delay = (record[0] - first) / speed - (time.perf_counter() - start)
+        if delay > 0:
+            time.sleep(delay)
+        queue.put(record)
+    queue.stop(timeout=None)
+    return [b["processing_ms"] / 1000 for b in queue.batches], queue.stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("log")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="1 = recorded pace, 10 = ten times faster, 0 = as fast as possible")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--limit", type=int, default=0, help="replay only the first N messages")
+    parser.add_argument("--lemmatizer", choices=("spacy", "lookup"), default="spacy")
+    parser.add_argument("--no-cache", action="store_true", help="disable the verdict cache and campaign reuse")
+    parser.add_argument("--verdicts", metavar="PATH", help="write one JSON verdict per message")
+    parser.add_argument("--profile", metavar="PATH", help="save a cProfile of the replay")
+    args = parser.parse_args(argv)
+
+    records = list(read_log(args.log))
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        print("Log is empty.")
+        return 1
+
+    if args.lemmatizer != "spacy":
+        engine.set_lemmatizer(args.lemmatizer)
+    if args.no_cache:
+        engine.CACHE = None
+        engine.CAMPAIGNS = None
+
+    # Load and warm everything before timing starts
+    engine.warm_up()
+    engine.ready.wait()
+    engine.classify_batch([records[0][2]])
+    # Start measuring from empty caches: no verdict or campaign left over from warming
+    if engine.CACHE is not None:
+        engine.CACHE.clear()
+    if engine.CAMPAIGNS is not None:
+        engine.CAMPAIGNS.clear()
+
+    labels = Counter()
+    out = open(args.verdicts, "w", encoding="utf-8") if args.verdicts else None
+
+    def on_batch(batch, results):
+        for (timestamp, sender, text), result in zip(batch, results):
+            labels[result["label"]] += 1
+            if out:
+                out.write(json.dumps({"ts": timestamp, "sender": sender, "text": text,
+                                      "label": result["label"], "score": result["score"]},
+                                     ensure_ascii=False) + "\n")
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    start = time.perf_counter()
+    queue_stats = None
+    if args.speed > 0:
+        batch_times, queue_stats = replay_timed(records, args.speed, args.batch_size, args.max_wait_ms, on_batch)
+    else:
+        batch_times = replay_max_speed(records, args.batch_size, on_batch)
+    elapsed = time.perf_counter() - start
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+    if out:
+        out.close()
+
+    span = records[-1][0] - records[0][0]
+    batch_times.sort()
+    print(f"messages:         {len(records):,} (recorded over {span:.1f}s)")
+    print(f"mode:             {'x%g speed' % args.speed if args.speed > 0 else 'max speed'}")
+    print(f"elapsed:          {elapsed:.2f}s ({len(records) / elapsed:,.0f} msg/s)")
+    print(f"batches:          {len(batch_times)} (p50 {percentile(batch_times, 0.5) * 1000:.1f} ms, "
+          f"p99 {percentile(batch_times, 0.99) * 1000:.1f} ms)")
+    if queue_stats:
+        print(f"queue wait:       p50 {queue_stats['wait_ms_p50']:.1f} ms, p99 {queue_stats['wait_ms_p99']:.1f} ms")
+    print("labels:           " + ", ".join(f"{label} {n:,}" for label, n in labels.most_common()))
+    if engine.CACHE is not None:
+        print(f"cache hit rate:   {engine.cache_stats()['hit_rate']:.1%}")
+    if args.profile:
+        print(f"profile saved to {args.profile} (python -m pstats {args.profile})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())